@@ -0,0 +1,296 @@
+#Bitboard representation of a Connect 4 position
+#
+# Each column uses 7 bits (the 6 playable rows plus one always-empty sentinel bit
+# on top), so the whole 6x7 board fits into 49 bits of a Python int. Bit
+# (col * 7 + row) is set when the cell in column col, counting rows from the
+# bottom, is occupied:
+#
+#    6 13 20 27 34 41 48   <- sentinel row (always empty)
+#    5 12 19 26 33 40 47   <- top row    (row 0 of the numpy board)
+#    4 11 18 25 32 39 46
+#    3 10 17 24 31 38 45
+#    2  9 16 23 30 37 44
+#    1  8 15 22 29 36 43
+#    0  7 14 21 28 35 42   <- bottom row (row 5 of the numpy board)
+#
+# The sentinel row means that shifting a mask never carries a piece from the top
+# of one column into the bottom of the next, which is what makes the
+# shift-and-mask win detection below work.
+
+import random
+
+ROWS = 6
+COLS = 7
+H1 = ROWS + 1 #bits per column, including the sentinel
+
+#One bit at the bottom cell of every column
+BOTTOM_MASK = sum(1 << (col * H1) for col in range(COLS))
+#Every playable cell (no sentinels)
+BOARD_MASK = BOTTOM_MASK * ((1 << ROWS) - 1)
+#Per-column masks
+BOTTOM_CELL = [1 << (col * H1) for col in range(COLS)]
+TOP_CELL = [1 << (col * H1 + ROWS - 1) for col in range(COLS)]
+COLUMN_MASK = [((1 << ROWS) - 1) << (col * H1) for col in range(COLS)]
+
+
+#Zobrist keys: ZOBRIST[player_num][bit index] is a random 64-bit number, and a
+#position's hash is the xor of the keys of every piece on the board. Player 1
+#always moves first, so the player to move is implied by the pieces and needs
+#no key of its own. The generator is seeded so hashes match across processes.
+_zobrist_rng = random.Random(20231003)
+ZOBRIST = [[0] * (COLS * H1)] + [[_zobrist_rng.getrandbits(64) for _ in range(COLS * H1)] for _ in range(2)]
+#The key of the mirror image of each cell (column col <-> column COLS - 1 - col),
+#so the hash of the mirrored position is kept up to date alongside the hash
+MIRROR_ZOBRIST = [[keys[(COLS - 1 - index // H1) * H1 + index % H1] for index in range(COLS * H1)] for keys in ZOBRIST]
+
+
+def cell_bit(row, col):
+    #Returns the bit for a cell given in numpy board coordinates (row 0 is the top)
+    return 1 << (col * H1 + (ROWS - 1 - row))
+
+
+def _window_masks():
+    #Builds the 69 four-cell windows (24 horizontal, 21 vertical, 12 + 12 diagonal)
+    windows = []
+    for col in range(COLS):
+        for row in range(ROWS):
+            for d_col, d_row in [(1, 0), (0, 1), (1, 1), (1, -1)]:
+                end_col = col + 3 * d_col
+                end_row = row + 3 * d_row
+                if 0 <= end_col < COLS and 0 <= end_row < ROWS:
+                    mask = 0
+                    for i in range(4):
+                        mask |= 1 << ((col + i * d_col) * H1 + row + i * d_row)
+                    windows.append(mask)
+    return windows
+
+#Every possible goal state as a bitmask
+WINDOW_MASKS = _window_masks()
+
+
+def _cell_windows():
+    #For every bit index, the non-vertical goal states that contain that cell
+    #(vertical wins are checked separately, since only the cells below a dropped
+    #piece can complete one)
+    cell_windows = [[] for _ in range(COLS * H1)]
+    for window in WINDOW_MASKS:
+        if window & (window >> 1):
+            continue
+        for index in range(COLS * H1):
+            if window >> index & 1:
+                cell_windows[index].append(window)
+    return cell_windows
+
+CELL_WINDOWS = _cell_windows()
+
+
+def mirror_bits(bits):
+    #Returns a bitboard flipped left to right (column col <-> column COLS - 1 - col)
+    mirrored = 0
+    for col in range(COLS):
+        mirrored |= ((bits >> (col * H1)) & COLUMN_MASK[0]) << ((COLS - 1 - col) * H1)
+    return mirrored
+
+
+def mirror_move(col):
+    return COLS - 1 - col
+
+
+def wins_through(bits, index):
+    #Returns True if bits has four in a row through the cell at bit index,
+    #only looking at the lines through that cell
+    if index % H1 >= 3 and (bits >> (index - 3)) & 15 == 15:
+        return True
+    for window in CELL_WINDOWS[index]:
+        if bits & window == window:
+            return True
+    return False
+
+
+def alignment(bits):
+    #Returns True if bits contains four in a row in any direction
+    #vertical
+    m = bits & (bits >> 1)
+    if m & (m >> 2):
+        return True
+    #horizontal
+    m = bits & (bits >> H1)
+    if m & (m >> (2 * H1)):
+        return True
+    #diagonal (bottom left to top right)
+    m = bits & (bits >> (H1 + 1))
+    if m & (m >> (2 * (H1 + 1))):
+        return True
+    #diagonal (top left to bottom right)
+    m = bits & (bits >> (H1 - 1))
+    if m & (m >> (2 * (H1 - 1))):
+        return True
+    return False
+
+
+class Position:
+    """
+    A Connect 4 position stored as bitboards.
+
+    pieces[1] and pieces[2] hold the stones of player 1 and player 2 (pieces[0]
+    is unused so the list can be indexed by player number), mask holds every
+    occupied cell and heights[col] is the bit index of the next free cell in
+    each column. Moves are made and unmade in place in O(1), and hash is the
+    Zobrist hash of the position, updated with every move.
+
+    mirror_hash is the hash of the position flipped left to right. A position
+    and its mirror image have the same value, and mirrored best moves, so
+    canonical_hash and canonical_key give both the same key for caches, and a
+    symmetric position (is_symmetric) only needs half of its moves searched.
+    """
+    def __init__(self):
+        self.pieces = [0, 0, 0]
+        self.mask = 0
+        self.hash = 0
+        self.mirror_hash = 0
+        self.heights = [col * H1 for col in range(COLS)]
+        self.num_moves = 0
+        #Columns played with make_move, so they can be taken back with unmake_move
+        self.history = []
+
+    @classmethod
+    def from_board(cls, board):
+        #Builds a position from a 6x7 numpy array or list of lists
+        position = cls()
+        for col in range(COLS):
+            for row in range(ROWS - 1, -1, -1):
+                player_num = board[row][col]
+                if player_num == 0:
+                    break
+                index = position.heights[col]
+                bit = 1 << index
+                position.pieces[int(player_num)] |= bit
+                position.mask |= bit
+                position.hash ^= ZOBRIST[int(player_num)][index]
+                position.mirror_hash ^= MIRROR_ZOBRIST[int(player_num)][index]
+                position.heights[col] += 1
+                position.num_moves += 1
+        return position
+
+    @classmethod
+    def from_pieces(cls, pieces1, pieces2):
+        #Builds a position from the bitboards of player 1 and player 2
+        position = cls()
+        for col in range(COLS):
+            for row in range(ROWS):
+                bit = 1 << (col * H1 + row)
+                if pieces1 & bit:
+                    position.make_move(col, 1)
+                elif pieces2 & bit:
+                    position.make_move(col, 2)
+                else:
+                    break
+        #Like from_board, the moves can not be taken back
+        position.history = []
+        return position
+
+    def to_board(self):
+        #Returns the position as a 6x7 list of lists using the numpy board encoding
+        board = [[0] * COLS for _ in range(ROWS)]
+        for row in range(ROWS):
+            for col in range(COLS):
+                bit = cell_bit(row, col)
+                if self.pieces[1] & bit:
+                    board[row][col] = 1
+                elif self.pieces[2] & bit:
+                    board[row][col] = 2
+        return board
+
+    def copy(self):
+        position = Position.__new__(Position)
+        position.pieces = self.pieces[:]
+        position.mask = self.mask
+        position.hash = self.hash
+        position.mirror_hash = self.mirror_hash
+        position.heights = self.heights[:]
+        position.num_moves = self.num_moves
+        position.history = self.history[:]
+        return position
+
+    def can_play(self, col):
+        return not self.mask & TOP_CELL[col]
+
+    def get_valid_moves(self):
+        mask = self.mask
+        return [col for col in range(COLS) if not mask & TOP_CELL[col]]
+
+    def make_move(self, col, player_num):
+        index = self.heights[col]
+        bit = 1 << index
+        self.pieces[player_num] |= bit
+        self.mask |= bit
+        self.hash ^= ZOBRIST[player_num][index]
+        self.mirror_hash ^= MIRROR_ZOBRIST[player_num][index]
+        self.heights[col] += 1
+        self.num_moves += 1
+        self.history.append(col)
+
+    def unmake_move(self):
+        #Takes back the last move made with make_move and returns its column
+        col = self.history.pop()
+        self.heights[col] -= 1
+        index = self.heights[col]
+        bit = 1 << index
+        self.mask ^= bit
+        player_num = 1 if self.pieces[1] & bit else 2
+        self.pieces[player_num] ^= bit
+        self.hash ^= ZOBRIST[player_num][index]
+        self.mirror_hash ^= MIRROR_ZOBRIST[player_num][index]
+        self.num_moves -= 1
+        return col
+
+    def is_full(self):
+        return self.num_moves == ROWS * COLS
+
+    def is_winning(self, player_num):
+        return alignment(self.pieces[player_num])
+
+    def is_winning_move(self, col, player_num):
+        #Returns True if player_num would win by playing in col
+        index = self.heights[col]
+        return wins_through(self.pieces[player_num] | (1 << index), index)
+
+    def last_move_wins(self):
+        #Returns True if the last move made with make_move won the game for whoever made it
+        if not self.history:
+            return False
+        index = self.heights[self.history[-1]] - 1
+        if self.pieces[1] >> index & 1:
+            return wins_through(self.pieces[1], index)
+        return wins_through(self.pieces[2], index)
+
+    def key(self):
+        #A unique integer for this position (player 1 stones + occupancy + bottom row)
+        return self.pieces[1] + self.mask + BOTTOM_MASK
+
+    def canonical_hash(self):
+        #Returns (the smaller of hash and mirror_hash, True if that is mirror_hash).
+        #When it is, moves stored under the hash are mirrored (see mirror_move)
+        if self.mirror_hash < self.hash:
+            return self.mirror_hash, True
+        return self.hash, False
+
+    def canonical_key(self):
+        #Like canonical_hash, but for key: (the smaller of the position's and its
+        #mirror image's key, True if that is the mirror image's)
+        key = self.key()
+        mirrored = mirror_bits(self.pieces[1]) + mirror_bits(self.mask) + BOTTOM_MASK
+        if mirrored < key:
+            return mirrored, True
+        return key, False
+
+    def is_symmetric(self):
+        #True if the position is its own mirror image
+        return self.hash == self.mirror_hash
+
+    def unique_moves(self):
+        #The valid moves, without the mirrored duplicates on a symmetric position
+        moves = self.get_valid_moves()
+        if self.hash == self.mirror_hash:
+            return [col for col in moves if col <= (COLS - 1) // 2]
+        return moves
@@ -0,0 +1,155 @@
+#Opening book
+#
+#   python Book.py -p 4 -d 8 -w 4 -o book.bin
+#
+# generates a book holding the best move, found with a depth -d negamax
+# search, for every position reachable in at most -p plies. AI players given
+# the book (param option book=<path>) look their position up in it
+# (OpeningBook.lookup) before searching, so the first moves of a game, which
+# are the most expensive to search, cost a binary search in a memory-mapped
+# file.
+#
+# File format: the 8 byte MAGIC, then one unsigned 64-bit record per
+# position, sorted: record = (key << 3) | move, where key is the position's
+# Bitboard.Position.canonical_key() (49 bits, the same for a position and its
+# mirror image) and move its column. A position and its mirror image share one
+# record, holding the move of the one with the smaller key; the other one
+# plays the mirrored move.
+
+import argparse
+import bisect
+import mmap
+import os
+import time
+from multiprocessing import Pool
+
+from Bitboard import Position, mirror_move
+from Evaluation import evaluate_bits
+from MoveOrdering import MoveOrderer, parse_ordering
+from Negamax import NegamaxSearch
+from TranspositionTable import TranspositionTable
+
+MAGIC = b'C4BOOK2\0'
+MOVE_BITS = 3
+#Book file written when no -o is given (the AI players' book=default)
+DEFAULT_BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'book.bin')
+
+
+class _Records:
+    #Sequence of the records' keys, so bisect can search the records
+    #(it only needs len and indexing)
+    def __init__(self, words):
+        self.words = words
+
+    def __len__(self):
+        return len(self.words)
+
+    def __getitem__(self, i):
+        return self.words[i] >> MOVE_BITS
+
+
+class OpeningBook:
+    def __init__(self, path=DEFAULT_BOOK_PATH):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError('{} is not an opening book'.format(path))
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if (len(self.mmap) - len(MAGIC)) % 8:
+            self.mmap.close()
+            raise ValueError('{} is not an opening book (truncated record)'.format(path))
+        self.words = memoryview(self.mmap)[len(MAGIC):].cast('Q')
+        self.records = _Records(self.words)
+
+    def __len__(self):
+        return len(self.words)
+
+    def lookup(self, position):
+        #Returns the book move for position (a Bitboard.Position), or None
+        key, mirrored = position.canonical_key()
+        i = bisect.bisect_left(self.records, key)
+        if i < len(self.words) and self.words[i] >> MOVE_BITS == key:
+            move = self.words[i] & ((1 << MOVE_BITS) - 1)
+            return mirror_move(move) if mirrored else move
+        return None
+
+    def close(self):
+        self.records = None
+        self.words.release()
+        self.mmap.close()
+
+
+def write_book(path, entries):
+    #Writes a book file from (key, move) pairs
+    records = sorted((key << MOVE_BITS) | move for key, move in entries)
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        for record in records:
+            f.write(record.to_bytes(8, 'little'))
+
+
+def book_positions(plies):
+    #Every position reachable in at most plies moves where the game is not
+    #over yet, up to mirror images, as (pieces of player 1, pieces of player 2)
+    layer = {Position().key(): Position()}
+    found = []
+    for ply in range(plies + 1):
+        next_layer = dict()
+        player_num = 1 if ply % 2 == 0 else 2
+        for position in layer.values():
+            found.append((position.pieces[1], position.pieces[2]))
+            if ply == plies:
+                continue
+            for col in position.get_valid_moves():
+                if position.is_winning_move(col, player_num):
+                    continue
+                child = position.copy()
+                child.make_move(col, player_num)
+                next_layer.setdefault(child.canonical_key()[0], child)
+        layer = next_layer
+    return found
+
+
+#The search used by a generator process, made once per process
+_search = None
+
+
+def _search_position(job):
+    #Pool worker: returns (canonical key, best move for the canonical position)
+    #for one book position
+    global _search
+    pieces1, pieces2, depth = job
+    if _search is None:
+        evaluate = lambda position: evaluate_bits(position.pieces[1], position.pieces[2])
+        _search = NegamaxSearch(evaluate, TranspositionTable(20), MoveOrderer(parse_ordering('all')),
+                                symmetry=True)
+    position = Position.from_pieces(pieces1, pieces2)
+    player_num = 1 if position.num_moves % 2 == 0 else 2
+    move, _, _ = _search.search(position, player_num, depth)
+    key, mirrored = position.canonical_key()
+    return key, mirror_move(move) if mirrored else move
+
+
+def generate(path, plies, depth, workers=1):
+    start_time = time.perf_counter()
+    positions = book_positions(plies)
+    print('Searching {} positions to depth {}'.format(len(positions), depth))
+    jobs = [(pieces1, pieces2, depth) for pieces1, pieces2 in positions]
+    if workers > 1:
+        with Pool(workers) as pool:
+            entries = pool.map(_search_position, jobs, chunksize=16)
+    else:
+        entries = [_search_position(job) for job in jobs]
+    write_book(path, entries)
+    print('Wrote {} positions to {} in {:.1f}s'.format(len(entries), path, time.perf_counter() - start_time))
+
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-p', '--plies', type=int, default=4, help='Book every position up to this many moves in (int)')
+    parser.add_argument('-d', '--depth', type=int, default=8, help='Negamax search depth for each position (int)')
+    parser.add_argument('-w', '--workers', type=int, default=1, help='Number of processes searching positions (int)')
+    parser.add_argument('-o', '--output', default=DEFAULT_BOOK_PATH, help='Book file to write')
+    args = parser.parse_args()
+
+    generate(args.output, args.plies, args.depth, args.workers)
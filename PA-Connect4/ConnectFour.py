@@ -6,68 +6,272 @@
 
 # system libs
 import argparse
+import logging
 import multiprocessing as mp
+import os
+import random
+import signal
 import sys
-
-#See if they have tkinter 
-try:
-    import tkinter as tk
-    graphics = True
-except ImportError as err:
-    graphics = False
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.util import Finalize
 
 # 3rd party libs
 import numpy as np
 
 # Local libs
+from Bitboard import H1, ROWS, Position
 from Player import AIPlayer, RandomPlayer, HumanPlayer
+from Ratings import parse_sprt
+
+#tkinter, imported by load_graphics the first time a game is shown in a window,
+#so games that are not shown never import it
+tk = None
+
+#Per-move output (moves, results, the AI players' search reports) goes through
+#this logger, set up by configure_logging
+log = logging.getLogger('connect4')
+
+#How long (seconds) an AI may take to answer after being told to stop,
+#before its worker process is killed and replaced
+SOFT_STOP_GRACE = 1.0
+
+def load_graphics():
+    #Imports tkinter if it has not been yet, returns False if it is not installed
+    global tk
+    if tk is None:
+        try:
+            import tkinter
+        except ImportError:
+            return False
+        tk = tkinter
+    return True
+
+#Logging level for each verbosity
+LOG_LEVELS = [logging.WARNING, logging.INFO, logging.DEBUG]
+
+def configure_logging(verbosity):
+    """
+    Sets how much per-move output is shown
+
+    INPUTS:
+    verbosity - 0 for none (only errors), 1 for moves and game results, 2 to
+                also show the AI players' search reports
+    """
+    log.setLevel(LOG_LEVELS[min(verbosity, len(LOG_LEVELS) - 1)])
+    if not log.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        log.addHandler(handler)
+        log.propagate = False
+
+def logging_verbosity():
+    #The verbosity this process's logging was set up with (0 if it never was).
+    #New processes are handed it, since a spawned (not forked) process starts
+    #with logging not set up
+    if log.level in LOG_LEVELS:
+        return LOG_LEVELS.index(log.level)
+    return 0
 
 #https://stackoverflow.com/a/37737985
-def turn_worker(board, send_end, p_func):
-    send_end.send(p_func(board))
+def ai_worker(conn, stop_event, verbosity):
+    #Runs in the worker process for a whole tournament, answering requests until None arrives:
+    # ('game', player, seed) starts a game, in which player makes the moves
+    # ('move', method, board) returns player.method(board)
+    # ('end',) ends the game
+    #(random reseeds itself in a forked process, so each game's seed is passed along)
+    if hasattr(os, 'setpgrp'):
+        #A process group of its own, shared with any processes its searches
+        #start, so AIWorker.kill can stop them all
+        os.setpgrp()
+    configure_logging(verbosity)
+    player = None
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+        if request[0] == 'game':
+            if player is not None:
+                player.close()
+            _, player, seed = request
+            random.seed(seed)
+            np.random.seed(seed)
+            player.stop_event = stop_event
+        elif request[0] == 'move':
+            _, method, board = request
+            conn.send(getattr(player, method)(board))
+        else:
+            #Stops anything the player keeps running between moves (its MCTS pool)
+            player.close()
+            player = None
+    if player is not None:
+        player.close()
+
+class AIWorker:
+    """
+    A long-lived process that computes one AI player's moves. A tournament
+    keeps one worker per player for all of its games (see get_game_workers),
+    so a process is started once per player, not once per game or per move.
+    new_game hands the worker the game's player object (with its params and
+    seat), which keeps its state (transposition table, MCTS tree) between
+    moves until end_game.
+
+    get_move gives the worker time_limit seconds. After that stop_event is set
+    (a soft stop), which makes searches that can stop early return their best
+    move so far. Only if no move arrives within SOFT_STOP_GRACE seconds after
+    that is the worker killed and started again (a hard timeout), together
+    with any processes its search started (parallel MCTS).
+    """
+    def __init__(self):
+        self.player = None
+        self.seed = None
+        self.start()
+
+    def start(self):
+        self.stop_event = mp.Event()
+        self.conn, worker_conn = mp.Pipe()
+        #Not a daemon, so parallel MCTS can start processes of its own
+        self.process = mp.Process(target=ai_worker, args=(worker_conn, self.stop_event, logging_verbosity()))
+        self.process.start()
+        if self.player is not None:
+            #Restarted part way through a game: carry on with the same player
+            self.conn.send(('game', self.player, self.seed))
+
+    def new_game(self, player, seed):
+        #Starts a game in which the worker makes player's moves
+        self.player = player
+        self.seed = seed
+        self.conn.send(('game', player, seed))
+
+    def end_game(self):
+        self.player = None
+        if self.process.is_alive():
+            self.conn.send(('end',))
+
+    def get_move(self, method, board, time_limit):
+        #Asks the worker for player.method(board), raises an Exception on a hard timeout
+        self.stop_event.clear()
+        self.conn.send(('move', method, board))
+        if not self.conn.poll(time_limit):
+            self.stop_event.set()
+            if not self.conn.poll(SOFT_STOP_GRACE):
+                self.restart()
+                raise Exception('Player Exceeded time limit')
+        return self.conn.recv()
+
+    def restart(self):
+        self.kill()
+        self.start()
+
+    def kill(self):
+        #Kills the worker and the processes it started, which are in its process group
+        try:
+            os.killpg(self.process.pid, signal.SIGTERM)
+        except (AttributeError, ProcessLookupError):
+            #No process groups (Windows), or the worker has not made its own yet
+            self.process.terminate()
+        self.process.join()
+
+    def close(self):
+        if self.process.is_alive():
+            self.conn.send(None)
+            self.process.join(SOFT_STOP_GRACE)
+            if self.process.is_alive():
+                self.kill()
+
+#The AI workers of this process, by player name, kept for every game the
+#process plays (a tournament's main process, or each process of its pool)
+game_workers = dict()
+
+def get_game_workers(names, types):
+    #Returns game_workers, with a worker started for each AI player in names
+    #(of the matching types) that does not have one yet
+    for name, method in zip(names, types):
+        if method in ai_types and name not in game_workers:
+            if not game_workers:
+                #Pool processes exit without running atexit functions, but do
+                #run multiprocessing's finalizers before waiting for their
+                #children, which would otherwise wait on the workers forever
+                Finalize(None, close_game_workers, exitpriority=10)
+            game_workers[name] = AIWorker()
+    return game_workers
+
+def close_game_workers():
+    #Stops every worker in game_workers, at the end of a tournament
+    for worker in game_workers.values():
+        worker.close()
+    game_workers.clear()
 
 #List of symbols 
 symbols = ['.', 'X', 'O']
 
+#Player types that are AIPlayers
+ai_types = ['ab', 'mcts', 'expmax', 'nm']
+
 #This is the main game class that will store the information 
 #necessary for the game to play and also run the game
 class Game:
-    def __init__(self, player1, player2, time, interactive):
+    def __init__(self, player1, player2, time, interactive, workers=None):
         self.players = [player1, player2]
         self.colors = ['yellow', 'red']
         self.current_turn = 0
         self.board = np.zeros([6,7]).astype(np.uint8)
+        #The same position as a bitboard: its column heights give the row a
+        #move lands in, and only the lines through the last piece are checked
+        #for a win, so the referee costs O(1) per move
+        self.position = Position()
+        self.last_player = None
         self.gui_board = []
         self.game_over = False
         self.winner = None
         self.ai_turn_limit = time
         self.interactive = interactive
-
-        global graphics
-        if not interactive:
-            graphics = False
-
-        if graphics:
-            #https://stackoverflow.com/a/38159672
-            root = tk.Tk()
-            root.title('Connect 4')
-            self.player_string = tk.Label(root, text=player1.player_string)
-            self.player_string.pack()
-            self.c = tk.Canvas(root, width=700, height=600)
-            self.c.pack()
-
-            for row in range(0, 700, 100):
-                column = []
-                for col in range(0, 700, 100):
-                    column.append(self.c.create_oval(row, col, row+100, col+100, fill=''))
-                self.gui_board.append(column)
-
-            tk.Button(root, text='Next Move', command=self.make_move).pack()
-            root.mainloop()
-        else:
-            if interactive:
-                self.print_board()
-            self.gameloop()
+        #Interactive games are shown in a window when tkinter is installed
+        self.graphics = interactive and load_graphics()
+
+        #One persistent worker process per AI player (None for the others). A
+        #tournament passes in workers that it keeps for all of its games,
+        #otherwise the game starts its own
+        self.own_workers = workers is None
+        if workers is None:
+            workers = [AIWorker() if player.type in ai_types else None for player in self.players]
+        self.workers = workers
+        for player, worker in zip(self.players, self.workers):
+            if worker is not None:
+                worker.new_game(player, random.getrandbits(32))
+
+        try:
+            if self.graphics:
+                #https://stackoverflow.com/a/38159672
+                root = tk.Tk()
+                root.title('Connect 4')
+                self.player_string = tk.Label(root, text=player1.player_string)
+                self.player_string.pack()
+                self.c = tk.Canvas(root, width=700, height=600)
+                self.c.pack()
+
+                for row in range(0, 700, 100):
+                    column = []
+                    for col in range(0, 700, 100):
+                        column.append(self.c.create_oval(row, col, row+100, col+100, fill=''))
+                    self.gui_board.append(column)
+
+                tk.Button(root, text='Next Move', command=self.make_move).pack()
+                root.mainloop()
+            else:
+                if interactive:
+                    self.print_board()
+                self.gameloop()
+        finally:
+            for worker in self.workers:
+                if worker is None:
+                    continue
+                if self.own_workers:
+                    worker.close()
+                else:
+                    worker.end_game()
+            for player in self.players:
+                if player.type in ai_types:
+                    player.close()
 
     def gameloop(self):
         while True:
@@ -87,29 +291,24 @@ class Game:
         if not self.game_over:
             current_player = self.players[self.current_turn]
 
-            if current_player.type == 'ab' or current_player.type == 'mcts' or current_player.type == 'expmax':
+            if current_player.type in ai_types:
                 
                 if current_player.type == 'mcts':
-                    p_func = current_player.get_mcts_move
+                    p_func = 'get_mcts_move'
                 elif current_player.type == 'expmax':
-                    p_func = current_player.get_expectimax_move                    
+                    p_func = 'get_expectimax_move'
+                elif current_player.type == 'nm':
+                    p_func = 'get_negamax_move'
                 else:
-                    p_func = current_player.get_alpha_beta_move
+                    p_func = 'get_alpha_beta_move'
                 
                 try:
-                    recv_end, send_end = mp.Pipe(False)
-                    p = mp.Process(target=turn_worker, args=(self.board, send_end, p_func))
-                    p.start()
-                    if p.join(self.ai_turn_limit) is None and p.is_alive():
-                        p.terminate()
-                        raise Exception('Player Exceeded time limit')
+                    move = self.workers[self.current_turn].get_move(p_func, self.board, self.ai_turn_limit)
                 except Exception as e:
                     uh_oh = 'Uh oh.... something is wrong with Player {}'
-                    print(uh_oh.format(current_player.player_number))
-                    print(e)
+                    log.error(uh_oh.format(current_player.player_number))
+                    log.error(e)
                     raise Exception('Game Over')
-
-                move = recv_end.recv()
             else:
                 move = current_player.get_move(self.board)
 
@@ -122,44 +321,39 @@ class Game:
                 self.loser = self.players[int(not self.current_turn)].name
                 #Mark the game as over
                 self.game_over = True
-                if graphics:
+                if self.graphics:
                     self.player_string.configure(text=self.players[self.current_turn].player_string + ' wins!')
                 else:
-                    print(self.players[self.current_turn].player_string + ' wins!')
-                print('Game over!')
+                    log.info(self.players[self.current_turn].player_string + ' wins!')
+                log.info('Game over!')
             elif self.game_tied():
                 #Mark the game as over
                 self.game_over = True
-                if graphics:
+                if self.graphics:
                     self.player_string.configure(text='Game ends in a tie!')
                 else:
-                    print('Game ends in a tie!')
+                    log.info('Game ends in a tie!')
             else:
                 self.current_turn = int(not self.current_turn)
-                if graphics:
+                if self.graphics:
                     self.player_string.configure(text=self.players[self.current_turn].name)
                 else:
-                    print('Current Turn: ', self.players[self.current_turn].name, '  using symbol : ', symbols[self.players[self.current_turn].player_number])
+                    log.info('Current Turn:  %s   using symbol :  %s', self.players[self.current_turn].name,
+                             symbols[self.players[self.current_turn].player_number])
 
     def update_board(self, move, player_num):
-        if 0 in self.board[:,move]:
-            update_row = -1
-            for row in range(1, self.board.shape[0]):
-                update_row = -1
-                if self.board[row, move] > 0 and self.board[row-1, move] == 0:
-                    update_row = row-1
-                elif row==self.board.shape[0]-1 and self.board[row, move] == 0:
-                    update_row = row
-
-                if update_row >= 0:
-                    self.board[update_row, move] = player_num
-                    if self.interactive:
-                        if graphics:
-                            self.c.itemconfig(self.gui_board[move][update_row],
-                                          fill=self.colors[self.current_turn])
-                        else:
-                            self.print_board()
-                    break
+        if 0 <= move < self.board.shape[1] and self.position.can_play(move):
+            #heights holds the bit index of the column's next free cell
+            update_row = ROWS - 1 - self.position.heights[move] % H1
+            self.position.make_move(move, player_num)
+            self.last_player = player_num
+            self.board[update_row, move] = player_num
+            if self.interactive:
+                if self.graphics:
+                    self.c.itemconfig(self.gui_board[move][update_row],
+                                  fill=self.colors[self.current_turn])
+                else:
+                    self.print_board()
         else:
             err = 'Invalid move by player {}. Column {}'.format(player_num, move)
             raise Exception(err)
@@ -184,65 +378,48 @@ class Game:
 
 
     def game_tied(self):
-        if not 0 in self.board:
-            return True
-        return False
+        return self.position.is_full()
 
     def game_won(self, player_num):
-        player_win_str = '{0}{0}{0}{0}'.format(player_num)
-        board = self.board
-        to_str = lambda a: ''.join(a.astype(str))
-
-        def check_horizontal(b):
-            for row in b:
-                if player_win_str in to_str(row):
-                    return True
-            return False
-
-        def check_verticle(b):
-            return check_horizontal(b.T)
-
-        def check_diagonal(b):
-            for op in [None, np.fliplr]:
-                op_board = op(b) if op else b
-                
-                root_diag = np.diagonal(op_board, offset=0).astype(int)
-                if player_win_str in to_str(root_diag):
-                    return True
-
-                for i in range(1, b.shape[1]-3):
-                    for offset in [i, -i]:
-                        diag = np.diagonal(op_board, offset=offset)
-                        diag = to_str(diag.astype(int))
-                        if player_win_str in diag:
-                            return True
-
-            return False
-
-        return (check_horizontal(board) or
-                check_verticle(board) or
-                check_diagonal(board))
+        #A game ends as soon as it is won, so a win by the player who moved
+        #last goes through the piece they just dropped
+        if player_num == self.last_player:
+            return self.position.last_move_wins()
+        return self.position.is_winning(player_num)
 
 
 
-def play_game(player1name, player2name, player1, player2, time, params1, params2, interactive, stats):
+def play_game(player1name, player2name, player1, player2, time, params1, params2, interactive, stats, seed=None,
+              workers=None):
     """
     Creates player objects based on the string parameters that are passed
     to it and creates game, which then plays
 
     INPUTS:
-    player1 - a string ['ab', 'random', 'human', 'mcts', 'expmax']
-    player2 - a string ['ab', 'random', 'human', 'mcts', 'expmax']
+    player1 - a string ['ab', 'random', 'human', 'mcts', 'expmax', 'nm']
+    player2 - a string ['ab', 'random', 'human', 'mcts', 'expmax', 'nm']
+    seed - seeds random and numpy before the game (and so the players' worker
+           processes, which are sent seeds drawn from it), or None to leave them alone
+    workers - AIWorkers by player name, kept by the caller between games (see
+              get_game_workers), or None for the game to start its own
     """
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+
     def make_player(name, method, num, params):
-        if method=='ab' or method=='expmax' or method == 'mcts':
-            return AIPlayer(num, name, method, params)
+        if method=='ab' or method=='expmax' or method == 'mcts' or method == 'nm':
+            return AIPlayer(num, name, method, params, time)
         elif method=='random':
             return RandomPlayer(num)
         elif method=='human':
             return HumanPlayer(num)
 
-    g = Game(make_player(player1name, player1, 1, params1), make_player(player2name, player2, 2, params2), time, interactive)
+    game_workers = None
+    if workers is not None:
+        game_workers = [workers.get(player1name), workers.get(player2name)]
+    g = Game(make_player(player1name, player1, 1, params1), make_player(player2name, player2, 2, params2), time, interactive,
+             game_workers)
 
     #Update stats with winner, loser, or ties
     if g.winner:
@@ -252,8 +429,35 @@ def play_game(player1name, player2name, player1, player2, time, params1, params2
         stats[player1name]['ties'] += 1
         stats[player2name]['ties'] += 1
 
+def check_player(method, params, time):
+    #Builds an AI player of type method with params once, so that a bad param
+    #(a value that does not parse, a missing book) raises ValueError before
+    #any game starts
+    if method in ai_types:
+        AIPlayer(1, method, method, params, time).close()
+
+#Runs one game of a tournament in a pool process and returns its stats. The
+#process's AI workers are kept for its later games (closed when it exits, or
+#by close_game_workers)
+def run_game(game):
+    index, names, types, time, params, seed = game
+    stats = {name: {'wins': 0, 'ties': 0, 'losses': 0} for name in names}
+    play_game(names[0], names[1], types[0], types[1], time, params[0], params[1], False, stats, seed,
+              get_game_workers(names, types))
+    return index, stats
+
 #This function sets up everything for the experiments, and repeatedly calls play_game to run the games
-def main(player1, player2, time, n, params1, params2):
+# With workers > 1 the games are shared out over a pool of that many processes
+# and the stats are added up as each game finishes. Game i is seeded with seed + i
+# (when a seed is given), so the results do not depend on the order games finish in
+# (as long as the players do not stop on the clock)
+# With an sprt (a Ratings.SPRT), player 1's results are fed to the test after
+# every game and the match stops as soon as it accepts a hypothesis
+# headless=True never shows a game or waits for input, even when n is 1.
+# verbosity is passed to configure_logging (None: everything for interactive
+# games, nothing otherwise)
+def main(player1, player2, time, n, params1, params2, workers=1, seed=None, sprt=None, headless=False,
+         verbosity=None):
     #Set up this run of the program
 
     #Create player names
@@ -267,6 +471,12 @@ def main(player1, player2, time, n, params1, params2):
     if p1name == p2name:
         print('Error: players must be different or have different parameters!')
         sys.exit()
+    for method, param_string in [(player1, params1), (player2, params2)]:
+        try:
+            check_player(method, param_string, time)
+        except ValueError as err:
+            print('Error: {}!'.format(err))
+            sys.exit()
 
     #Get list of player names
     pnames = [p1name, p2name]
@@ -282,6 +492,14 @@ def main(player1, player2, time, n, params1, params2):
     interactive = False
     if n == 1 or 'human' in pnames:
         interactive = True
+    if headless:
+        if 'human' in [player1, player2]:
+            print('Error: a human player can not play a headless game!')
+            sys.exit()
+        interactive = False
+    if verbosity is None:
+        verbosity = 2 if interactive else 0
+    configure_logging(verbosity)
 
     # #Play 2n games (Each player goes first n times)
     N = 2*n
@@ -290,21 +508,85 @@ def main(player1, player2, time, n, params1, params2):
         N = 1
 
     print(f"Playing {N} games between {p1name} and {p2name}")
+    #Games that were started (all of them, unless an SPRT stops the match)
+    started = N
+
+    if workers > 1 and not interactive:
+        #Same schedule as below: the players swap who goes first every game
+        games = []
+        for i in range(N):
+            games.append((i, list(pnames), [pstring[name] for name in pnames], time,
+                          [params[name] for name in pnames], None if seed is None else seed + i))
+            pnames.reverse()
+
+        with ProcessPoolExecutor(workers, initializer=configure_logging, initargs=(verbosity,)) as pool:
+            futures = [pool.submit(run_game, game) for game in games]
+            for finished, future in enumerate(as_completed(futures), 1):
+                index, game_stats = future.result()
+                for name in game_stats:
+                    for result in game_stats[name]:
+                        stats[name][result] += game_stats[name][result]
+                log.info('Game {} done ({} of {}): {}'.format(index, finished, N, stats))
+                if sprt is not None and sprt_update(sprt, game_stats[p1name]):
+                    #Games that have not started are dropped, running ones
+                    #finish but are not counted
+                    for future in futures:
+                        future.cancel()
+                    break
+        started = sum(1 for future in futures if not future.cancelled())
+    else:
+        #One AI worker process per player for the whole match
+        workers = get_game_workers(pnames, [pstring[name] for name in pnames])
+        try:
+            for i in range(N):
+                before = dict(stats[p1name])
+
+                #Play game with current player list
+                play_game(pnames[0], pnames[1], pstring[pnames[0]], pstring[pnames[1]], time, params[pnames[0]], params[pnames[1]], interactive, stats,
+                          None if seed is None else seed + i, workers)
 
-    for i in range(N):
-        #Play game with current player list
-        play_game(pnames[0], pnames[1], pstring[pnames[0]], pstring[pnames[1]], time, params[pnames[0]], params[pnames[1]], interactive, stats)
+                #Reverse the order of the players
+                pnames.reverse()
 
-        #Reverse the order of the players
-        pnames.reverse()
+                if sprt is not None:
+                    game_stats = {result: stats[p1name][result] - before[result] for result in before}
+                    if sprt_update(sprt, game_stats):
+                        started = i + 1
+                        break
+        finally:
+            close_game_workers()
 
 
     #Display the results of the games
     print('Experiment results: ')
     print(stats)
+    if sprt is not None:
+        #Only the games fed to the test count; pool games still running when
+        #it stopped were played, but are in neither the test nor the stats
+        counted = sprt.wins + sprt.ties + sprt.losses
+        print(sprt.summary())
+        if sprt.status() == 'H1':
+            print('SPRT accepted H1: {} is {} Elo stronger than {}'.format(p1name, sprt.elo1, p2name))
+        elif sprt.status() == 'H0':
+            print('SPRT accepted H0: {} is {} Elo stronger than {}'.format(p1name, sprt.elo0, p2name))
+        else:
+            print('SPRT undecided after all {} games'.format(counted))
+        print('Games counted: {}, games played but not counted: {}, games saved: {}'.format(
+            counted, started - counted, N - started))
+
+#Adds one game (player 1's stats for it) to an SPRT, returns True when the test has finished
+def sprt_update(sprt, game_stats):
+    if game_stats['wins']:
+        sprt.add(1)
+    elif game_stats['losses']:
+        sprt.add(0)
+    else:
+        sprt.add(0.5)
+    log.info(sprt.summary())
+    return sprt.status() is not None
 
 if __name__=='__main__':
-    player_types = ['ab', 'random', 'human', 'mcts', 'expmax']
+    player_types = ['ab', 'random', 'human', 'mcts', 'expmax', 'nm']
     parser = argparse.ArgumentParser()
     parser.add_argument('player1', choices=player_types)
     parser.add_argument('player2', choices=player_types)
@@ -318,6 +600,28 @@ if __name__=='__main__':
                         type=int,
                         default=60,
                         help='Time to wait for a move in seconds (int)')
+    parser.add_argument('-w', '--workers',
+                        type=int,
+                        default=1,
+                        help='Number of games to play at the same time, each in its own process (int)')
+    parser.add_argument('-s', '--seed',
+                        type=int,
+                        default=None,
+                        help='Seed for the random numbers; game i uses seed + i (int)')
+    parser.add_argument('--sprt',
+                        default=None,
+                        help='elo0,elo1[,alpha,beta]: stop the match early once a sequential probability '
+                             'ratio test decides whether player 1 is elo0 or elo1 Elo stronger than player 2')
+    parser.add_argument('--headless',
+                        action='store_true',
+                        help='Never show the game or wait for input, even for a single game')
+    parser.add_argument('-v', '--verbose',
+                        action='count',
+                        default=None,
+                        help='Show every move and game result (-vv: also the AI players\' search reports). '
+                             'On by default only for interactive games')
     args = parser.parse_args()
 
-    main(args.player1, args.player2, args.time, args.number, args.params1, args.params2)
\ No newline at end of file
+    sprt = parse_sprt(args.sprt) if args.sprt else None
+    main(args.player1, args.player2, args.time, args.number, args.params1, args.params2, args.workers, args.seed, sprt,
+         args.headless, args.verbose)
\ No newline at end of file
@@ -0,0 +1,244 @@
+#Vectorized evaluation of Connect 4 boards
+#
+# The evaluation counts, for each player, the goal states (four-cell windows)
+# that are still open to them, i.e. that hold none of the other player's
+# pieces. Each open window is worth weights[n], where n is the number of the
+# player's own pieces already in it, and the score is player 1's total minus
+# player 2's total. With the default weights of 1 this is the number of open
+# goal states for player 1 minus the number for player 2.
+#
+# WINDOW_INDICES lists the 69 windows as flat indices into a 6x7 board
+# (row * 7 + col), so a whole board is scored with one fancy-indexing lookup
+# and a few reductions instead of a Python loop over the windows. The batch
+# versions score a whole stack of boards (or bitboards) in one call, which
+# spreads numpy's per-call overhead over many leaves.
+#
+# The searches use evaluate_bitboards for batched leaf evaluation and
+# evaluate_bits / IncrementalEvaluator for single leaves, where a plain loop
+# over the bitboard masks beats numpy's call overhead. evaluate_board scores
+# the numpy board that AIPlayer.evaluation_function is given.
+
+import numpy as np
+
+from Bitboard import COLS, H1, ROWS, WINDOW_MASKS
+
+WIN_SCORE = 300
+DEFAULT_WEIGHTS = (1, 1, 1, 1)
+
+
+def _window_indices():
+    #Converts the bitboard windows into flat numpy board indices
+    indices = []
+    for window in WINDOW_MASKS:
+        cells = []
+        for col in range(COLS):
+            for row in range(ROWS):
+                if window >> (col * H1 + row) & 1:
+                    cells.append((ROWS - 1 - row) * COLS + col)
+        indices.append(cells)
+    return np.array(indices, dtype=np.intp)
+
+#(69, 4) flat board indices of every goal state
+WINDOW_INDICES = _window_indices()
+#The same goal states as uint64 bitboard masks
+WINDOW_BITS = np.array(WINDOW_MASKS, dtype=np.uint64)
+
+
+def _popcount(x):
+    #Number of set bits in each element of a uint64 array (for numpy < 2.0)
+    x = x - ((x >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    x = (x & np.uint64(0x3333333333333333)) + ((x >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return (x * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+popcount = getattr(np, 'bitwise_count', _popcount)
+
+
+def parse_weights(weights):
+    #Turns a 'weights' option such as '1/2/5/20' into a tuple of 4 weights, for
+    #open windows holding 0, 1, 2 and 3 of the player's pieces
+    if not weights:
+        return DEFAULT_WEIGHTS
+    values = tuple(int(w) for w in weights.split('/'))
+    if len(values) != 4:
+        raise ValueError('weights needs 4 values (for 0 to 3 pieces), got {}'.format(weights))
+    return values
+
+
+def weight_table(weights):
+    #Lookup table indexed by piece count; a full window (4 pieces) is a win and
+    #is handled separately, so it scores 0 here
+    return np.array(list(weights) + [0], dtype=np.int64)
+
+
+def evaluate_board(board, weights=DEFAULT_WEIGHTS):
+    """
+    Scores a board from player 1's point of view
+
+    INPUTS:
+    board - a 6x7 numpy array (or list of lists) using the game's encoding
+    weights - value of an open window holding 0, 1, 2 and 3 of the player's pieces
+
+    RETURNS:
+    WIN_SCORE / -WIN_SCORE if player 1 / player 2 has four in a row, otherwise
+    the weighted open goal states of player 1 minus those of player 2
+    """
+    cells = np.asarray(board).ravel()[WINDOW_INDICES]
+    count1 = np.count_nonzero(cells == 1, axis=1)
+    count2 = np.count_nonzero(cells == 2, axis=1)
+
+    if (count1 == 4).any():
+        return WIN_SCORE
+    if (count2 == 4).any():
+        return -WIN_SCORE
+
+    table = weight_table(weights)
+    score1 = table[count1][count2 == 0].sum()
+    score2 = table[count2][count1 == 0].sum()
+    return int(score1 - score2)
+
+
+def _score_counts(count1, count2, weights):
+    #Scores (N, 69) arrays of per-window piece counts, one row per board
+    table = weight_table(weights)
+    open1 = count2 == 0
+    open2 = count1 == 0
+    scores = (table[count1] * open1).sum(axis=1) - (table[count2] * open2).sum(axis=1)
+    scores[(count2 == 4).any(axis=1)] = -WIN_SCORE
+    scores[(count1 == 4).any(axis=1)] = WIN_SCORE
+    return scores
+
+
+def evaluate_boards(boards, weights=DEFAULT_WEIGHTS):
+    """
+    Batch version of evaluate_board
+
+    INPUTS:
+    boards - an (N, 6, 7) numpy array of boards using the game's encoding
+    weights - value of an open window holding 0, 1, 2 and 3 of the player's pieces
+
+    RETURNS:
+    A length N int64 array with evaluate_board's score for each board
+    """
+    boards = np.asarray(boards)
+    cells = boards.reshape(len(boards), ROWS * COLS)[:, WINDOW_INDICES]
+    count1 = np.count_nonzero(cells == 1, axis=2)
+    count2 = np.count_nonzero(cells == 2, axis=2)
+    return _score_counts(count1, count2, weights)
+
+
+def evaluate_bitboards(pieces1, pieces2, weights=DEFAULT_WEIGHTS):
+    """
+    Batch version of evaluate_board for bitboards
+
+    INPUTS:
+    pieces1, pieces2 - length N sequences of Bitboard player 1 / player 2 masks
+    weights - value of an open window holding 0, 1, 2 and 3 of the player's pieces
+
+    RETURNS:
+    A length N int64 array with evaluate_board's score for each position
+    """
+    pieces1 = np.asarray(pieces1, dtype=np.uint64)
+    pieces2 = np.asarray(pieces2, dtype=np.uint64)
+    count1 = popcount(pieces1[:, None] & WINDOW_BITS).astype(np.intp)
+    count2 = popcount(pieces2[:, None] & WINDOW_BITS).astype(np.intp)
+    return _score_counts(count1, count2, weights)
+
+
+def evaluate_bits(pieces1, pieces2, weights=DEFAULT_WEIGHTS):
+    #Same score as evaluate_board for bitboards, without the win check.
+    #For a single position a loop over the 69 masks is faster than numpy.
+    score = 0
+    if weights == DEFAULT_WEIGHTS:
+        for window in WINDOW_MASKS:
+            if not window & pieces2:
+                score += 1
+            if not window & pieces1:
+                score -= 1
+        return score
+
+    for window in WINDOW_MASKS:
+        own1 = window & pieces1
+        own2 = window & pieces2
+        if not own2:
+            score += weights[own1.bit_count()]
+        if not own1:
+            score -= weights[own2.bit_count()]
+    return score
+
+
+def _cell_window_ids():
+    #For every bitboard bit index, the ids (positions in WINDOW_MASKS) of the
+    #goal states that contain that cell: at most 13 (4 horizontal, 3 vertical,
+    #and 3 + 3 diagonal)
+    cell_window_ids = [[] for _ in range(COLS * H1)]
+    for window_id, window in enumerate(WINDOW_MASKS):
+        for index in range(COLS * H1):
+            if window >> index & 1:
+                cell_window_ids[index].append(window_id)
+    return cell_window_ids
+
+CELL_WINDOW_IDS = _cell_window_ids()
+
+
+class IncrementalEvaluator:
+    """
+    Keeps the evaluation of the position being searched up to date as moves
+    are made and taken back, so scoring a leaf is just reading self.score.
+
+    counts[player_num][window id] is the number of player_num's pieces in each
+    goal state. A move only changes the goal states through the cell it fills,
+    so make_move and unmake_move touch at most 13 windows. As with
+    evaluate_bits, four in a row is not scored here; the searches detect wins
+    themselves.
+    """
+    def __init__(self, weights=DEFAULT_WEIGHTS):
+        #Weight of an open window by piece count, a full window scores 0
+        self.table = list(weights) + [0]
+        self.counts = [None, [0] * len(WINDOW_MASKS), [0] * len(WINDOW_MASKS)]
+        self.score = 0
+        #(index, player_num, score change) for each move, for unmake_move
+        self.stack = []
+
+    def reset(self, position):
+        #Starts tracking position (a Bitboard.Position)
+        pieces1 = position.pieces[1]
+        pieces2 = position.pieces[2]
+        for window_id, window in enumerate(WINDOW_MASKS):
+            self.counts[1][window_id] = (window & pieces1).bit_count()
+            self.counts[2][window_id] = (window & pieces2).bit_count()
+        self.score = evaluate_bits(pieces1, pieces2, tuple(self.table[:4]))
+        self.stack = []
+
+    def make_move(self, index, player_num):
+        #Records player_num filling the cell at bitboard bit index
+        #(position.heights[col] before the move is made)
+        table = self.table
+        own_counts = self.counts[player_num]
+        other_counts = self.counts[3 - player_num]
+        gain = 0 #change in the score from the mover's point of view
+        for window_id in CELL_WINDOW_IDS[index]:
+            own = own_counts[window_id]
+            other = other_counts[window_id]
+            if other == 0:
+                #still open for the mover, now with one more piece
+                gain += table[own + 1] - table[own]
+                if own == 0:
+                    #and no longer open for the other player
+                    gain += table[0]
+            elif own == 0:
+                #was open for the other player, the mover just blocked it
+                gain += table[other]
+            own_counts[window_id] = own + 1
+
+        change = gain if player_num == 1 else -gain
+        self.score += change
+        self.stack.append((index, player_num, change))
+
+    def unmake_move(self):
+        #Takes back the last make_move
+        index, player_num, change = self.stack.pop()
+        own_counts = self.counts[player_num]
+        for window_id in CELL_WINDOW_IDS[index]:
+            own_counts[window_id] -= 1
+        self.score -= change
@@ -0,0 +1,158 @@
+#Round-robin league between any number of agents
+#
+#   python League.py ab:5 mcts:20000 expmax:4 -n 2 -w 4 -c league.json
+#
+# Each agent is a player type, optionally followed by ':' and its param string
+# (the same string as -p1/-p2 in ConnectFour.py, e.g. 'ab:6,tt=22'). Every pair
+# of agents plays 2n games, each agent going first n times, and the games are
+# shared out over a pool of worker processes. Game i of the schedule is seeded
+# with seed + i. After each game the results so far are written to the
+# checkpoint file, so a league that is stopped picks up where it left off when
+# it is started again with the same arguments. At the end the agents are ranked
+# by Elo rating (see Ratings.py).
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from ConnectFour import ai_types, check_player, close_game_workers, configure_logging, log, run_game
+from Ratings import elo_ratings, print_ratings
+
+#Player types that can take part (not 'human')
+league_types = ai_types + ['random']
+
+
+def parse_agent(spec):
+    #Splits an agent spec such as 'ab:5' or 'random' into (type, param string or None)
+    ptype, _, param = spec.partition(':')
+    if ptype not in league_types:
+        raise ValueError('Unknown player type {} in {}, choose from {}'.format(ptype, spec, league_types))
+    if ptype == 'random' and param:
+        #The random player takes no params, and is always named 'random'
+        raise ValueError('The random player takes no param string, got {}'.format(spec))
+    return ptype, param or None
+
+
+def make_schedule(specs, n, time, seed):
+    #Every game of the league, as the game tuples that ConnectFour.run_game takes
+    games = []
+    for a in range(len(specs)):
+        for b in range(a + 1, len(specs)):
+            names = [specs[a], specs[b]]
+            for i in range(2 * n):
+                #Swap who goes first every game
+                order = names if i % 2 == 0 else names[::-1]
+                agents = [parse_agent(name) for name in order]
+                index = len(games)
+                games.append((index, list(order), [agent[0] for agent in agents], time,
+                              [agent[1] for agent in agents], None if seed is None else seed + index))
+    return games
+
+
+def load_checkpoint(path, specs, n):
+    #Returns the finished games saved in path ({game index: [first, second, score of first]})
+    if path is None or not os.path.exists(path):
+        return dict()
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint['agents'] != specs or checkpoint['n'] != n:
+        print('Error: checkpoint {} is for a different league ({} agents, n={})'.format(
+            path, checkpoint['agents'], checkpoint['n']))
+        sys.exit()
+    return {int(index): result for index, result in checkpoint['games'].items()}
+
+
+def save_checkpoint(path, specs, n, finished):
+    #Writes the finished games to path (through a temporary file, so an
+    #interrupted write never leaves a broken checkpoint)
+    if path is None:
+        return
+    with open(path + '.tmp', 'w') as f:
+        json.dump({'agents': specs, 'n': n, 'games': finished}, f)
+    os.replace(path + '.tmp', path)
+
+
+def game_result(names, stats):
+    #Turns run_game's stats into [first player, second player, score of the first player]
+    first, second = names
+    if stats[first]['wins']:
+        score = 1.0
+    elif stats[first]['losses']:
+        score = 0.0
+    else:
+        score = 0.5
+    return [first, second, score]
+
+
+def main(specs, time, n, workers=1, seed=None, checkpoint=None, verbosity=0):
+    if len(set(specs)) != len(specs) or len(specs) < 2:
+        print('Error: a league needs at least two different agents!')
+        sys.exit()
+    for spec in specs:
+        try:
+            check_player(*parse_agent(spec), time)
+        except ValueError as err:
+            print('Error: {}!'.format(err))
+            sys.exit()
+    if sum(1 for spec in specs if parse_agent(spec)[0] == 'random') > 1:
+        print('Error: only one random agent can take part!')
+        sys.exit()
+
+    configure_logging(verbosity)
+    games = make_schedule(specs, n, time, seed)
+    finished = load_checkpoint(checkpoint, specs, n)
+    remaining = [game for game in games if game[0] not in finished]
+    print(f"League of {len(specs)} agents: {len(games)} games, {len(finished)} already played")
+
+    def record(index, stats):
+        finished[index] = game_result(games[index][1], stats)
+        save_checkpoint(checkpoint, specs, n, finished)
+        log.info('Game {} done ({} of {}): {}'.format(index, len(finished), len(games), finished[index]))
+
+    if workers > 1:
+        with ProcessPoolExecutor(workers, initializer=configure_logging, initargs=(verbosity,)) as pool:
+            futures = [pool.submit(run_game, game) for game in remaining]
+            for future in as_completed(futures):
+                record(*future.result())
+    else:
+        try:
+            for game in remaining:
+                record(*run_game(game))
+        finally:
+            close_game_workers()
+
+    print('League results: ')
+    print_ratings(elo_ratings(specs, list(finished.values())))
+
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('agents', nargs='+', help="Agent specs: a player type, optionally followed by ':' and its param string")
+    parser.add_argument('-n', '--number',
+                        help='Number of games each agent goes first against each other agent',
+                        type=int,
+                        default=1)
+    parser.add_argument('-t', '--time',
+                        type=int,
+                        default=60,
+                        help='Time to wait for a move in seconds (int)')
+    parser.add_argument('-w', '--workers',
+                        type=int,
+                        default=1,
+                        help='Number of games to play at the same time, each in its own process (int)')
+    parser.add_argument('-s', '--seed',
+                        type=int,
+                        default=None,
+                        help='Seed for the random numbers; game i uses seed + i (int)')
+    parser.add_argument('-c', '--checkpoint',
+                        default=None,
+                        help='File that keeps the finished games, so an interrupted league can be resumed')
+    parser.add_argument('-v', '--verbose',
+                        action='count',
+                        default=0,
+                        help='Show every move and finished game (-vv: also the AI players\' search reports)')
+    args = parser.parse_args()
+
+    main(args.agents, args.time, args.number, args.workers, args.seed, args.checkpoint, args.verbose)
@@ -0,0 +1,717 @@
+#Array-backed Monte Carlo tree search
+#
+# Instead of one MCTSNode object per node, the tree lives in flat typed arrays
+# indexed by node id (the root is node 0):
+#   visits[id]       - number of visits
+#   wins[id]         - total reward, from the point of view of the player who
+#                      made the move into the node (win = +1, loss = -1, tie = 0)
+#   first_child[id]  - id of the node's first child, or -1 before expansion;
+#                      the children of a node are stored next to each other
+#   num_children[id] - number of children
+#   moves[id]        - the column played to reach the node
+#   status[id]       - IN_PLAY, WON (the move into the node won) or TIE
+# Nodes hold no board: the position is rebuilt on the way down by playing the
+# moves along the path on one Position, and taken back after the iteration.
+# The arrays grow by doubling, so millions of nodes cost tens of megabytes.
+#
+# A tree can be kept from one move to the next: advance() returns the subtree
+# below the moves played since (found with played_moves from the two
+# positions) as a new tree, and save() / load() keep a tree in a file between
+# the processes that search each move.
+#
+# With symmetry=True a node whose position is its own mirror image only gets
+# one child per mirrored pair of moves (Position.unique_moves): both moves lead
+# to mirror images of one position, so their statistics would be the same.
+#
+# With batch=n each iteration plays n random games from the new leaf at once
+# (Rollouts.batch_rollouts) and backs up all n results (leaf parallelization).
+#
+# root_parallel_search grows several independent trees at once on a process
+# pool (root parallelization): each tree uses its own random seed, and the
+# visit and win counts of the root children are summed before the move is picked.
+#
+# tree_parallel_search instead has several processes grow one tree together
+# (tree parallelization). The tree's arrays live in a multiprocessing
+# shared_memory block (SharedMCTSTree). A process descending the tree adds a
+# virtual loss to every node on its path, so the others are steered to
+# different branches until its result is backed up. Updates take one of a
+# fixed set of striped locks (picked by node id), so processes rarely wait on
+# each other.
+
+import logging
+import math
+import multiprocessing as mp
+import queue
+import random
+import time
+from array import array
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from Bitboard import COLS, ROWS, Position
+from Rollouts import batch_rollouts
+
+#Debugging output goes to the game's logger, at DEBUG level
+log = logging.getLogger('connect4')
+
+INITIAL_CAPACITY = 1 << 14
+#How many iterations are run between checks of the clock
+ITERATIONS_PER_TIME_CHECK = 32
+#c value used in the UCB calculation
+UCB_C = math.sqrt(2)
+
+#Node status
+IN_PLAY = 0
+WON = 1
+TIE = 2
+
+#Tree parallelization
+# The shared tree can not grow, so it gets a fixed number of nodes
+# (23 bytes each, about 24MB for 2**20 nodes)
+SHARED_CAPACITY = 1 << 20
+#Losses added to each node on a path while its result is pending
+VIRTUAL_LOSS = 1
+#Number of locks guarding the node statistics
+LOCK_STRIPES = 64
+#Seconds between checks on the workers while waiting for their results, and
+#how long past the deadline to wait for a worker before giving up on it
+RESULT_POLL = 0.1
+RESULT_GRACE = 1.0
+
+
+class MCTSTree:
+    def __init__(self, position, player_number, capacity=INITIAL_CAPACITY, c=UCB_C, batch=1, symmetry=False):
+        #position is a Bitboard.Position (copied) with player_number to move
+        self.position = position.copy()
+        self.player_number = player_number
+        self.c = c
+        self.symmetry = symmetry
+        #Rollouts per iteration, batch > 1 plays them together with numpy
+        self.batch = batch
+        #Seeded from random, so seeding random also fixes the batched rollouts
+        self.rng = np.random.default_rng(random.getrandbits(64)) if batch > 1 else None
+
+        self.capacity = capacity
+        self.visits = array('q', bytes(8 * capacity))
+        self.wins = array('d', bytes(8 * capacity))
+        self.first_child = array('i', [-1]) * capacity
+        self.num_children = array('b', bytes(capacity))
+        self.moves = array('b', [-1]) * capacity
+        self.status = array('b', bytes(capacity))
+
+        #The root
+        self.size = 1
+
+    def grow(self, needed):
+        #Makes room for at least needed more nodes
+        while self.size + needed > self.capacity:
+            extra = self.capacity
+            self.visits.extend(array('q', bytes(8 * extra)))
+            self.wins.extend(array('d', bytes(8 * extra)))
+            self.first_child.extend(array('i', [-1]) * extra)
+            self.num_children.extend(array('b', bytes(extra)))
+            self.moves.extend(array('b', [-1]) * extra)
+            self.status.extend(array('b', bytes(extra)))
+            self.capacity += extra
+
+    def expand(self, node, moves):
+        #Adds one child per move to node, stored next to each other
+        self.grow(len(moves))
+        first = self.size
+        for k, move in enumerate(moves):
+            self.moves[first + k] = move
+        self.first_child[node] = first
+        self.num_children[node] = len(moves)
+        self.size += len(moves)
+        return first
+
+    def child_moves(self, position):
+        #The moves a node with this position is expanded with
+        if self.symmetry:
+            return position.unique_moves()
+        return position.get_valid_moves()
+
+    def select_child(self, node):
+        #Returns the first unvisited child, otherwise the child with the best UCB
+        first = self.first_child[node]
+        visits = self.visits
+        wins = self.wins
+        log_n = math.log(visits[node]) if visits[node] > 0 else 0.0
+        c = self.c
+        best_child = first
+        best_ub = -math.inf
+        for child in range(first, first + self.num_children[node]):
+            n = visits[child]
+            if n == 0:
+                return child
+            #Same bound as MCTSNode.upper_bound
+            ub = wins[child] / n + c * math.sqrt(log_n) / n
+            if ub > best_ub:
+                best_ub = ub
+                best_child = child
+        return best_child
+
+    def iterate(self):
+        #One MCTS iteration: select + expand, simulate, backpropagate
+        position = self.position
+        player_num = self.player_number
+        node = 0
+        path = [0]
+        while self.status[node] == IN_PLAY:
+            if self.first_child[node] < 0:
+                self.expand(node, self.child_moves(position))
+            child = self.select_child(node)
+            position.make_move(self.moves[child], player_num)
+            player_num = 3 - player_num
+            path.append(child)
+            node = child
+            if self.visits[child] == 0:
+                #A new node: find out if the game is over here
+                if position.last_move_wins():
+                    self.status[child] = WON
+                elif position.is_full():
+                    self.status[child] = TIE
+                break
+
+        #Result (summed over the batch) from the point of view of the player who moved into node
+        batch = self.batch
+        status = self.status[node]
+        if status == WON:
+            result = batch
+        elif status == TIE:
+            result = 0
+        elif batch > 1:
+            result = -int(batch_rollouts(position, player_num, batch, self.rng).sum())
+        else:
+            result = -rollout(position, player_num)
+
+        #Backpropagate, flipping the point of view at every level
+        visits = self.visits
+        wins = self.wins
+        for node in reversed(path):
+            visits[node] += batch
+            wins[node] += result
+            result = -result
+
+        for _ in range(len(path) - 1):
+            position.unmake_move()
+
+    def run(self, iterations=None, deadline=None, stop_event=None):
+        """
+        Runs MCTS iterations until either budget is used up
+
+        INPUTS:
+        iterations - most iterations to run, or None for no limit
+        deadline - time.perf_counter() value to stop at, or None for no limit
+        stop_event - a multiprocessing Event that stops the search when set, or None
+
+        RETURNS:
+        The number of iterations run
+        """
+        if iterations is None and deadline is None:
+            raise ValueError('MCTS needs an iteration limit or a deadline')
+        done = 0
+        while iterations is None or done < iterations:
+            self.iterate()
+            done += 1
+            if done % ITERATIONS_PER_TIME_CHECK == 0:
+                if deadline is not None and time.perf_counter() > deadline:
+                    break
+                if stop_event is not None and stop_event.is_set():
+                    break
+        return done
+
+    def root_children(self):
+        #Returns (move, visits, wins) for each child of the root
+        first = self.first_child[0]
+        if first < 0:
+            return []
+        return [(self.moves[child], self.visits[child], self.wins[child])
+                for child in range(first, first + self.num_children[0])]
+
+    def max_child(self):
+        #Return the most visited move at the root
+        max_n = 0
+        max_m = None
+        for move, n, _ in self.root_children():
+            if n > max_n:
+                max_n = n
+                max_m = move
+        return max_m
+
+    def print_root(self):
+        #Debugging utility that will log the root's information
+        log.debug('Total Node visits and wins: %s %s', self.visits[0], self.wins[0])
+        log.debug('Tree size: %s', self.size)
+        log.debug('Children: ')
+        for move, n, w in self.root_children():
+            log.debug('    %s : %s %s', move, n, w)
+
+    def find_child(self, node, move):
+        #Returns the child of node reached by playing move, or -1 if it is not in the tree
+        first = self.first_child[node]
+        if first < 0:
+            return -1
+        for child in range(first, first + self.num_children[node]):
+            if self.moves[child] == move:
+                return child
+        return -1
+
+    def advance(self, moves):
+        """
+        Moves the root down the tree
+
+        INPUTS:
+        moves - the columns played from the root position, in order
+
+        RETURNS:
+        A new MCTSTree holding the subtree below those moves, with its
+        statistics, or None if the tree never reached that position
+        """
+        node = 0
+        position = self.position.copy()
+        player_num = self.player_number
+        for move in moves:
+            node = self.find_child(node, move)
+            if node < 0 or self.status[node] != IN_PLAY:
+                return None
+            position.make_move(move, player_num)
+            player_num = 3 - player_num
+
+        #Copy the subtree breadth first, so siblings stay next to each other
+        tree = MCTSTree(position, player_num, c=self.c, batch=self.batch, symmetry=self.symmetry)
+        tree.visits[0] = self.visits[node]
+        tree.wins[0] = self.wins[node]
+        queue = [(node, 0)]
+        for old, new in queue:
+            first = self.first_child[old]
+            if first < 0:
+                continue
+            count = self.num_children[old]
+            new_first = tree.expand(new, [self.moves[child] for child in range(first, first + count)])
+            for k in range(count):
+                tree.visits[new_first + k] = self.visits[first + k]
+                tree.wins[new_first + k] = self.wins[first + k]
+                tree.status[new_first + k] = self.status[first + k]
+                queue.append((first + k, new_first + k))
+        return tree
+
+    def save(self, path):
+        #Writes the tree (root position and the used part of the arrays) to a file
+        size = self.size
+        with open(path, 'wb') as f:
+            array('q', [self.player_number, self.position.pieces[1], self.position.pieces[2], size]).tofile(f)
+            for values in [self.visits, self.wins, self.first_child, self.num_children, self.moves, self.status]:
+                values[:size].tofile(f)
+
+    @classmethod
+    def load(cls, path, c=UCB_C, batch=1, symmetry=False):
+        #Reads a tree written by save (symmetry must match the saved tree's)
+        with open(path, 'rb') as f:
+            header = array('q')
+            header.fromfile(f, 4)
+            player_number, pieces1, pieces2, size = header
+            tree = cls(Position.from_pieces(pieces1, pieces2), player_number, max(INITIAL_CAPACITY, size), c, batch,
+                       symmetry)
+            for name in ['visits', 'wins', 'first_child', 'num_children', 'moves', 'status']:
+                values = getattr(tree, name)
+                saved = array(values.typecode)
+                saved.fromfile(f, size)
+                values[:size] = saved
+        tree.size = size
+        return tree
+
+
+def rollout(position, player_num):
+    #Plays random moves from position (player_num to move) until the game ends,
+    #then takes them all back. Returns +1 if player_num wins, -1 if they lose
+    #and 0 for a tie
+    made = 0
+    mover = player_num
+    result = 0
+    while True:
+        moves = position.get_valid_moves()
+        position.make_move(moves[random.randint(0, len(moves) - 1)], mover)
+        made += 1
+        if position.last_move_wins():
+            result = 1 if mover == player_num else -1
+            break
+        if position.is_full():
+            break
+        mover = 3 - mover
+
+    for _ in range(made):
+        position.unmake_move()
+    return result
+
+
+def played_moves(root_position, position, player_number):
+    """
+    Works out the moves that lead from one position to a later one
+
+    INPUTS:
+    root_position, position - Bitboard.Positions, position the later one
+    player_number - the player to move in root_position
+
+    RETURNS:
+    The list of columns played (starting with player_number's move), or None
+    if position can not be reached from root_position
+    """
+    old = root_position.pieces
+    new = position.pieces
+    if new[1] & old[1] != old[1] or new[2] & old[2] != old[2]:
+        return None
+    #The cells each player filled since root_position
+    added = [0, new[1] ^ old[1], new[2] ^ old[2]]
+
+    #Places the new cells in turn. The order matters (a cell can only be
+    #filled once the one below it is), so a choice that gets stuck is taken
+    #back and the next one tried; only a couple of moves are ever missing
+    current = root_position.copy()
+    moves = []
+
+    def place(mover):
+        if not added[1] and not added[2]:
+            return True
+        for col in current.get_valid_moves():
+            bit = 1 << current.heights[col]
+            if added[mover] & bit:
+                current.make_move(col, mover)
+                added[mover] ^= bit
+                moves.append(col)
+                if place(3 - mover):
+                    return True
+                moves.pop()
+                added[mover] ^= bit
+                current.unmake_move()
+        return False
+
+    if not place(player_number):
+        return None
+    return moves
+
+
+def run_tree(args):
+    #Pool worker for root_parallel_search: grows one tree and returns
+    #(root children, iterations run)
+    position, player_number, iterations, end_time, seed, batch, symmetry = args
+    random.seed(seed)
+    deadline = None
+    if end_time is not None:
+        #end_time is wall clock time, which (unlike perf_counter) means the same
+        #thing in every process
+        deadline = time.perf_counter() + (end_time - time.time())
+    tree = MCTSTree(position, player_number, batch=batch, symmetry=symmetry)
+    done = tree.run(iterations, deadline)
+    return tree.root_children(), done
+
+
+def merge_root_children(results):
+    #Sums the (move, visits, wins) root children of several trees, by move
+    merged = dict()
+    for children in results:
+        for move, n, w in children:
+            if move not in merged:
+                merged[move] = [0, 0.0]
+            merged[move][0] += n
+            merged[move][1] += w
+    return [(move, n, w) for move, (n, w) in sorted(merged.items())]
+
+
+def root_parallel_search(position, player_number, workers, iterations=None, deadline=None, seed=None, batch=1,
+                         symmetry=False, pool=None):
+    """
+    Root-parallel MCTS: grows workers independent trees on a process pool and
+    merges their root statistics
+
+    INPUTS:
+    position - a Bitboard.Position with player_number to move
+    player_number - the player to move (1 or 2)
+    workers - number of trees (and pool processes)
+    iterations - most iterations for each tree, or None for no limit
+    deadline - time.perf_counter() value to stop at, or None for no limit
+    seed - seed of the first tree (tree k uses seed + k), or None for a random one
+    batch - rollouts per iteration in each tree
+    symmetry - collapse mirrored moves on symmetric positions (see MCTSTree)
+    pool - a multiprocessing Pool of at least workers processes to grow the
+           trees on, kept by the caller between moves; None starts one for
+           this search only
+
+    RETURNS:
+    (merged root children as (move, visits, wins), the most visited move,
+     total iterations over all trees)
+    """
+    if seed is None:
+        seed = random.randrange(1 << 30)
+    end_time = None
+    if deadline is not None:
+        end_time = time.time() + (deadline - time.perf_counter())
+    jobs = [(position, player_number, iterations, end_time, seed + k, batch, symmetry) for k in range(workers)]
+    if pool is None:
+        with mp.Pool(workers) as pool:
+            results = pool.map(run_tree, jobs)
+    else:
+        results = pool.map(run_tree, jobs)
+
+    children = merge_root_children([result[0] for result in results])
+    total = sum(result[1] for result in results)
+    max_n = 0
+    max_m = None
+    for move, n, _ in children:
+        if n > max_n:
+            max_n = n
+            max_m = move
+    return children, max_m, total
+
+
+class SharedMCTSTree(MCTSTree):
+    """
+    An MCTSTree whose arrays are views of one shared_memory block, so that
+    several processes can grow it at the same time.
+
+    Create the tree with name=None in the parent process and attach to it in
+    the workers with the parent's shm.name. locks is a list of 1 + LOCK_STRIPES
+    multiprocessing locks: locks[0] guards the node count, and node id's
+    statistics and children are guarded by locks[1 + id % LOCK_STRIPES].
+    Children are marked WON / TIE when they are created (not when they are
+    first visited), so that a node's status is set before any other process
+    can reach it.
+    """
+    def __init__(self, position, player_number, locks, capacity=SHARED_CAPACITY, c=UCB_C,
+                 name=None, virtual_loss=VIRTUAL_LOSS, symmetry=False):
+        self.position = position.copy()
+        self.player_number = player_number
+        self.c = c
+        self.symmetry = symmetry
+        self.capacity = capacity
+        self.locks = locks
+        self.virtual_loss = virtual_loss
+        #Plays one rollout per iteration
+        self.batch = 1
+
+        #8 bytes of node count, then the arrays (8-byte ones first, so all are aligned)
+        size = 8 + capacity * (8 + 8 + 4 + 1 + 1 + 1)
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        buf = self.shm.buf
+        views = []
+        offset = 0
+        for typecode, count in [('q', 1), ('q', capacity), ('d', capacity), ('i', capacity),
+                                ('b', capacity), ('b', capacity), ('b', capacity)]:
+            nbytes = count * array(typecode).itemsize
+            views.append(buf[offset:offset + nbytes].cast(typecode))
+            offset += nbytes
+        (self.header, self.visits, self.wins, self.first_child,
+         self.num_children, self.moves, self.status) = views
+
+        if name is None:
+            #New shared memory is zero filled, only first_child needs setting up
+            self.first_child[:] = array('i', [-1]) * capacity
+            self.header[0] = 1
+
+    @property
+    def size(self):
+        return self.header[0]
+
+    def close(self):
+        #Detaches this process from the shared tree (the views must go first)
+        self.header.release()
+        self.visits.release()
+        self.wins.release()
+        self.first_child.release()
+        self.num_children.release()
+        self.moves.release()
+        self.status.release()
+        self.shm.close()
+
+    def unlink(self):
+        #Frees the shared memory, once every process has closed it
+        self.shm.unlink()
+
+    def lock_for(self, node):
+        return self.locks[1 + node % LOCK_STRIPES]
+
+    def expand_node(self, node, player_num):
+        #Adds the children of node, whose position is self.position with
+        #player_num to move. Call with node's lock held.
+        #Returns False if the tree is full.
+        position = self.position
+        moves = self.child_moves(position)
+        with self.locks[0]:
+            first = self.header[0]
+            if first + len(moves) > self.capacity:
+                return False
+            self.header[0] = first + len(moves)
+        fills_board = position.num_moves + 1 == ROWS * COLS
+        for k, move in enumerate(moves):
+            self.moves[first + k] = move
+            if position.is_winning_move(move, player_num):
+                self.status[first + k] = WON
+            elif fills_board:
+                self.status[first + k] = TIE
+        self.num_children[node] = len(moves)
+        #Set last: once first_child is set other processes may select the children
+        self.first_child[node] = first
+        return True
+
+    def iterate(self):
+        #One MCTS iteration with virtual loss: select + expand, simulate, backpropagate
+        position = self.position
+        player_num = self.player_number
+        visits = self.visits
+        wins = self.wins
+        vl = self.virtual_loss
+
+        node = 0
+        path = [0]
+        with self.lock_for(0):
+            visits[0] += vl
+            wins[0] -= vl
+        while self.status[node] == IN_PLAY:
+            if self.first_child[node] < 0:
+                with self.lock_for(node):
+                    #Another process may have expanded it while we waited
+                    if self.first_child[node] < 0 and not self.expand_node(node, player_num):
+                        #The tree is full: simulate from this node
+                        break
+            child = self.select_child(node)
+            with self.lock_for(child):
+                new = visits[child] == 0
+                visits[child] += vl
+                wins[child] -= vl
+            position.make_move(self.moves[child], player_num)
+            player_num = 3 - player_num
+            path.append(child)
+            node = child
+            if new:
+                break
+
+        #Result from the point of view of the player who moved into node
+        status = self.status[node]
+        if status == WON:
+            result = 1
+        elif status == TIE:
+            result = 0
+        else:
+            result = -rollout(position, player_num)
+
+        #Backpropagate, replacing the virtual losses with the real result
+        for node in reversed(path):
+            with self.lock_for(node):
+                visits[node] += 1 - vl
+                wins[node] += result + vl
+            result = -result
+
+        for _ in range(len(path) - 1):
+            position.unmake_move()
+
+
+def _shared_tree_worker(name, capacity, position, player_number, locks, iterations, end_time, seed, symmetry,
+                        results):
+    #Process target for tree_parallel_search: grows the shared tree and
+    #reports the number of iterations run
+    random.seed(seed)
+    deadline = None
+    if end_time is not None:
+        deadline = time.perf_counter() + (end_time - time.time())
+    tree = SharedMCTSTree(position, player_number, locks, capacity, name=name, symmetry=symmetry)
+    try:
+        results.put(tree.run(iterations, deadline))
+    finally:
+        tree.close()
+
+
+def _collect_results(results, processes, deadline):
+    #Sums the iteration counts the tree_parallel_search workers put on
+    #results. Returns None if some worker exited without reporting, or is
+    #still running RESULT_GRACE seconds after the deadline (it may be stuck on
+    #a lock held by a worker that died); the stragglers are terminated.
+    total = 0
+    reported = 0
+    while reported < len(processes):
+        try:
+            total += results.get(timeout=RESULT_POLL)
+            reported += 1
+            continue
+        except queue.Empty:
+            pass
+        overdue = deadline is not None and time.perf_counter() > deadline + RESULT_GRACE
+        if overdue or not any(p.is_alive() for p in processes):
+            break
+
+    if reported == len(processes):
+        return total
+    #Results put just before the last worker exited may still be in the pipe
+    while reported < len(processes):
+        try:
+            total += results.get(timeout=RESULT_POLL)
+            reported += 1
+        except queue.Empty:
+            break
+    if reported == len(processes):
+        return total
+
+    for p in processes:
+        if p.is_alive():
+            p.terminate()
+            p.join()
+    log.warning('Tree-parallel MCTS: %d of %d workers did not report (exit codes %s)',
+                len(processes) - reported, len(processes), [p.exitcode for p in processes])
+    return None
+
+
+def tree_parallel_search(position, player_number, workers, iterations=None, deadline=None, seed=None,
+                         capacity=SHARED_CAPACITY, symmetry=False):
+    """
+    Tree-parallel MCTS: workers processes grow one shared tree
+
+    INPUTS:
+    position - a Bitboard.Position with player_number to move
+    player_number - the player to move (1 or 2)
+    workers - number of processes
+    iterations - most iterations in total (split between the processes), or None for no limit
+    deadline - time.perf_counter() value to stop at, or None for no limit
+    seed - seed of the first process (process k uses seed + k), or None for a random one
+    capacity - number of nodes the shared tree can hold
+    symmetry - collapse mirrored moves on symmetric positions (see MCTSTree)
+
+    RETURNS:
+    (root children as (move, visits, wins), the most visited move, total iterations)
+    """
+    if seed is None:
+        seed = random.randrange(1 << 30)
+    end_time = None
+    if deadline is not None:
+        end_time = time.time() + (deadline - time.perf_counter())
+
+    locks = [mp.Lock() for _ in range(1 + LOCK_STRIPES)]
+    tree = SharedMCTSTree(position, player_number, locks, capacity, symmetry=symmetry)
+    try:
+        results = mp.Queue()
+        processes = []
+        for k in range(workers):
+            share = None
+            if iterations is not None:
+                share = iterations // workers + (1 if k < iterations % workers else 0)
+            p = mp.Process(target=_shared_tree_worker,
+                           args=(tree.shm.name, capacity, position, player_number, locks,
+                                 share, end_time, seed + k, symmetry, results))
+            p.start()
+            processes.append(p)
+        total = _collect_results(results, processes, deadline)
+        if total is None:
+            #A worker died (or hung) before reporting: its iterations are in
+            #the tree all the same, so count them from the root's visits
+            total = max(0, int(tree.visits[0]))
+        for p in processes:
+            p.join()
+
+        children = tree.root_children()
+        best_move = tree.max_child()
+    finally:
+        tree.close()
+        tree.unlink()
+    return children, best_move, total
@@ -0,0 +1,111 @@
+#Move ordering for the alpha-beta searches
+#
+# Alpha-beta prunes the most when the best move is searched first. A MoveOrderer
+# combines any of these heuristics (named in the 'order' player option, joined
+# with '+', e.g. order=center+hash or order=all):
+#   center  - static order, center columns first (they take part in the most goal states)
+#   hash    - the best move stored in the transposition table for this position
+#             (usually from the previous iterative deepening iteration)
+#   killer  - the last two moves that caused a cutoff at the same ply
+#   history - columns that caused cutoffs anywhere in the search, weighted by depth
+
+CENTER_ORDER = [3, 2, 4, 1, 5, 0, 6]
+HEURISTICS = ['center', 'hash', 'killer', 'history']
+KILLERS_PER_PLY = 2
+MAX_PLY = 43
+
+
+def parse_ordering(order):
+    #Turns an 'order' option such as 'center+killer', 'all' or 'none' into a set of heuristics
+    if order == 'all':
+        return set(HEURISTICS)
+    if order == 'none' or not order:
+        return set()
+    heuristics = set(order.split('+'))
+    for heuristic in heuristics:
+        if heuristic not in HEURISTICS:
+            raise ValueError('Unknown move ordering {}, choose from {}'.format(heuristic, HEURISTICS))
+    return heuristics
+
+
+class SearchStats:
+    #Counters for one search (one call to get_alpha_beta_move)
+    def __init__(self):
+        self.nodes = 0           #nodes visited
+        self.interior_nodes = 0  #nodes whose children were searched
+        self.cutoffs = 0         #nodes where the remaining moves were pruned
+        self.first_move_cutoffs = 0 #cutoffs caused by the first move searched
+        self.tt_cutoffs = 0      #nodes answered by the transposition table
+
+    def cutoff_rate(self):
+        #Fraction of interior nodes that were cut off
+        if self.interior_nodes == 0:
+            return 0.0
+        return self.cutoffs / self.interior_nodes
+
+    def first_move_cutoff_rate(self):
+        #Fraction of cutoffs that happened on the first move, a measure of how good the ordering is
+        if self.cutoffs == 0:
+            return 0.0
+        return self.first_move_cutoffs / self.cutoffs
+
+    def summary(self):
+        return 'nodes: {}, cutoff rate: {:.3f}, first move cutoff rate: {:.3f}, transposition cutoffs: {}'.format(
+            self.nodes, self.cutoff_rate(), self.first_move_cutoff_rate(), self.tt_cutoffs)
+
+
+class MoveOrderer:
+    def __init__(self, heuristics):
+        self.center = 'center' in heuristics
+        self.hash = 'hash' in heuristics
+        self.killer = 'killer' in heuristics
+        self.history = 'history' in heuristics
+
+        #killers[ply] holds up to KILLERS_PER_PLY columns, most recent first
+        self.killers = [[] for _ in range(MAX_PLY)]
+        #history_scores[player_num][col], index 0 unused
+        self.history_scores = [[0] * 7 for _ in range(3)]
+
+    def new_search(self):
+        #Called at the start of every move: killers are position specific, while
+        #history scores are halved so older results count for less
+        for killers in self.killers:
+            del killers[:]
+        for scores in self.history_scores:
+            for col in range(7):
+                scores[col] //= 2
+
+    def order(self, moves, ply, player_num, hash_move=None):
+        #Returns moves (a list of columns) in the order they should be searched
+        if self.center:
+            ordered = [col for col in CENTER_ORDER if col in moves]
+        else:
+            ordered = list(moves)
+
+        if self.history:
+            #Stable sort, so equal scores keep the center/left-to-right order
+            scores = self.history_scores[player_num]
+            ordered.sort(key=lambda col: -scores[col])
+
+        if self.killer:
+            for col in reversed(self.killers[ply]):
+                if col in ordered:
+                    ordered.remove(col)
+                    ordered.insert(0, col)
+
+        if self.hash and hash_move is not None and hash_move in ordered:
+            ordered.remove(hash_move)
+            ordered.insert(0, hash_move)
+
+        return ordered
+
+    def record_cutoff(self, move, ply, player_num, remaining):
+        #Called with the move that caused a cutoff, remaining is the depth left at that node
+        if self.killer:
+            killers = self.killers[ply]
+            if move in killers:
+                killers.remove(move)
+            killers.insert(0, move)
+            del killers[KILLERS_PER_PLY:]
+        if self.history:
+            self.history_scores[player_num][move] += remaining * remaining
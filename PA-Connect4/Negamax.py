@@ -0,0 +1,221 @@
+#Negamax search engine used by the 'nm' AIPlayer
+#
+# Scores are always from the point of view of the player to move, so one
+# function handles both players: a child's score is negated on the way back
+# up. The search is fail-soft alpha-beta with
+#   - principal variation search: after the first move, every move is searched
+#     with a null window (alpha, alpha + 1) first, and only re-searched with the
+#     full window when it beats alpha
+#   - aspiration windows: each iterative deepening iteration starts with a
+#     window around the previous iteration's score, and widens it on failure
+#   - the transposition table and move ordering shared with the 'ab' search
+#   - optionally (symmetry), mirror symmetry: a position and its mirror image
+#     share one transposition table entry, and on a symmetric position only
+#     one move of each mirrored pair is searched
+#
+# The position is modified in place with make_move/unmake_move, so no copies
+# are made during the search.
+
+import time
+
+from Bitboard import mirror_move
+from MoveOrdering import MoveOrderer, SearchStats
+from TranspositionTable import EXACT, LOWER, UPPER
+
+WIN_SCORE = 300
+INFINITY = 10000
+#Half-width of the aspiration window (evaluation units)
+ASPIRATION_WINDOW = 10
+#How many nodes are searched between checks of the clock
+NODES_PER_TIME_CHECK = 1024
+
+
+class SearchTimeout(Exception):
+    #Raised inside a search when its deadline has passed
+    pass
+
+
+class NegamaxSearch:
+    def __init__(self, evaluate, table=None, orderer=None, aspiration_window=ASPIRATION_WINDOW, pvs=True,
+                 stop_event=None, symmetry=False):
+        #evaluate(position) scores a position from player 1's point of view, and
+        #must score a position and its mirror image the same when symmetry is on
+        #stop_event (a multiprocessing Event) ends the search early when it is set
+        self.evaluate = evaluate
+        self.stop_event = stop_event
+        self.table = table
+        self.orderer = orderer if orderer is not None else MoveOrderer(set())
+        self.aspiration_window = aspiration_window
+        self.pvs = pvs
+        self.symmetry = symmetry
+        self.stats = SearchStats()
+        self.deadline = None
+        self.root_best_move = None
+
+    def search(self, position, player_num, max_depth, deadline=None):
+        """
+        Iterative deepening negamax from position with player_num to move
+
+        INPUTS:
+        position - a Bitboard.Position (it is not modified)
+        player_num - the player to move (1 or 2)
+        max_depth - deepest iteration to run
+        deadline - time.perf_counter() value to stop at, or None for no limit
+
+        RETURNS:
+        (best move, score for player_num, depth of the last finished iteration)
+        """
+        start_time = time.perf_counter()
+        position = position.copy()
+        self.deadline = deadline
+        self.stats = SearchStats()
+        self.orderer.new_search()
+
+        moves = self.orderer.order(self.valid_moves(position), 0, player_num)
+        best_move = moves[0]
+        score = 0
+        depth_reached = 0
+        max_depth = min(max_depth, 42 - position.num_moves)
+        try:
+            for depth in range(1, max_depth + 1):
+                move, score = self.aspiration_search(position, player_num, depth, score, depth_reached > 0)
+                best_move = move
+                depth_reached = depth
+                if abs(score) >= WIN_SCORE:
+                    #The game is decided, deeper searches will not change that
+                    break
+                #The next (deeper) iteration takes at least as long as all the
+                #ones before it, so it would most likely not finish once over
+                #half of the budget is gone
+                if deadline is not None:
+                    now = time.perf_counter()
+                    elapsed = now - start_time
+                    if now + elapsed > deadline:
+                        break
+        except SearchTimeout:
+            #Out of time part way through a depth: keep the last finished result
+            pass
+        finally:
+            self.deadline = None
+
+        return best_move, score, depth_reached
+
+    def aspiration_search(self, position, player_num, depth, guess, use_window):
+        #Searches to depth with a window around guess, widening it if the score falls outside
+        if use_window and self.aspiration_window > 0:
+            alpha = guess - self.aspiration_window
+            beta = guess + self.aspiration_window
+        else:
+            alpha = -INFINITY
+            beta = INFINITY
+
+        while True:
+            score = self.negamax(position, player_num, depth, 0, alpha, beta)
+            if score <= alpha and alpha > -INFINITY:
+                #Failed low: the real score is below the window
+                alpha = -INFINITY
+            elif score >= beta and beta < INFINITY:
+                #Failed high: the real score is above the window
+                beta = INFINITY
+            else:
+                return self.root_best_move, score
+
+    def valid_moves(self, position):
+        #The moves to search: with symmetry, a mirrored pair of moves on a
+        #symmetric position has the same score, so only one of them is searched
+        if self.symmetry:
+            return position.unique_moves()
+        return position.get_valid_moves()
+
+    def out_of_time(self):
+        #True once the deadline has passed or the search has been asked to stop
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            return True
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    def negamax(self, position, player_num, depth, ply, alpha, beta):
+        #Returns the fail-soft score of position for player_num, searched depth more plies
+        stats = self.stats
+        stats.nodes += 1
+        if stats.nodes % NODES_PER_TIME_CHECK == 0 and self.out_of_time():
+            raise SearchTimeout()
+
+        #base case: the other player just won
+        if position.last_move_wins():
+            return -WIN_SCORE
+        #base case: tie
+        if position.is_full():
+            return 0
+        #base case: depth limit, use the evaluation function
+        if depth == 0:
+            if player_num == 1:
+                return self.evaluate(position)
+            return -self.evaluate(position)
+
+        hash_move = None
+        table = self.table
+        if table is not None:
+            if self.symmetry:
+                key, mirrored = position.canonical_hash()
+            else:
+                key, mirrored = position.hash, False
+            entry = table.probe(key)
+            if entry is not None:
+                value, entry_depth, flag, entry_move = entry
+                if entry_depth >= depth and ply > 0:
+                    if flag == EXACT:
+                        stats.tt_cutoffs += 1
+                        return value
+                    if flag == LOWER and value > alpha:
+                        alpha = value
+                    elif flag == UPPER and value < beta:
+                        beta = value
+                    if alpha >= beta:
+                        stats.tt_cutoffs += 1
+                        return value
+                if entry_move >= 0:
+                    hash_move = mirror_move(entry_move) if mirrored else entry_move
+
+        #the window actually searched, which decides the bound type stored below
+        original_alpha = alpha
+        other_player = 3 - player_num
+        moves = self.orderer.order(self.valid_moves(position), ply, player_num, hash_move)
+        stats.interior_nodes += 1
+        best_score = -INFINITY
+        best_move = moves[0]
+        for index, move in enumerate(moves):
+            position.make_move(move, player_num)
+            if index == 0 or not self.pvs:
+                score = -self.negamax(position, other_player, depth - 1, ply + 1, -beta, -alpha)
+            else:
+                #Null window: only proves whether this move beats alpha
+                score = -self.negamax(position, other_player, depth - 1, ply + 1, -alpha - 1, -alpha)
+                if alpha < score < beta:
+                    #It does, so search it again with the full window to get its real score
+                    score = -self.negamax(position, other_player, depth - 1, ply + 1, -beta, -alpha)
+            position.unmake_move()
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        stats.cutoffs += 1
+                        if index == 0:
+                            stats.first_move_cutoffs += 1
+                        self.orderer.record_cutoff(move, ply, player_num, depth)
+                        break
+
+        if ply == 0:
+            self.root_best_move = best_move
+
+        if table is not None:
+            if best_score <= original_alpha:
+                flag = UPPER
+            elif best_score >= beta:
+                flag = LOWER
+            else:
+                flag = EXACT
+            table.store(key, best_score, depth, flag, mirror_move(best_move) if mirrored else best_move)
+        return best_score
@@ -2,21 +2,48 @@
 #  - incorporate MCTS with other code
 #  - pass command line param string to each AI
 
+import logging
 import math
+import multiprocessing as mp
+import os
 import random
+import tempfile
 import numpy as np
 import time
 
+from Bitboard import COLS, ROWS, Position, mirror_move
+from Book import DEFAULT_BOOK_PATH, OpeningBook
+from Evaluation import IncrementalEvaluator, evaluate_bits, evaluate_bitboards, evaluate_board, parse_weights
+from MoveOrdering import MoveOrderer, SearchStats, parse_ordering
+from MCTS import ITERATIONS_PER_TIME_CHECK, MCTSTree, played_moves, root_parallel_search, tree_parallel_search
+from Negamax import ASPIRATION_WINDOW, NODES_PER_TIME_CHECK, NegamaxSearch, SearchTimeout
+from Solver import DEFAULT_CACHE_PATH, Solver, SolverCache
+from TranspositionTable import EXACT, LOWER, UPPER, TranspositionTable
+
+#The searches' per-move reports are logged at DEBUG level (see ConnectFour.configure_logging)
+log = logging.getLogger('connect4')
+
+#Fraction of the game's per-move time limit that iterative deepening plans to use,
+#leaving the rest for starting the worker process and sending back the move
+TIME_LIMIT_FRACTION = 0.8
+#Time budget (seconds) for iterative deepening when the time limit is unknown
+DEFAULT_TIME_BUDGET = 1.0
+
 
 class AIPlayer:
-    def __init__(self, player_number, name, ptype, param):
+    def __init__(self, player_number, name, ptype, param, time_limit=None):
         self.player_number = player_number
         self.name = name
         self.type = ptype
         self.player_string = 'Player {}: '.format(player_number)+self.name
         self.other_player_number = 1 if player_number == 2 else 2
+        #The game's time limit for each move in seconds (None if unknown)
+        self.time_limit = time_limit
 
         #Parameters for the different agents
+        # The param string is the depth limit (or iterations for MCTS), optionally
+        # followed by comma separated key=value options, e.g. '6,tt=22,replace=always'
+        param, self.options = parse_params(param)
         
         self.depth_limit = 3 #default depth-limit - change if you desire
         #Alpha-beta
@@ -24,6 +51,39 @@ class AIPlayer:
         if self.type == 'ab' and param:
             self.depth_limit = int(param)
 
+        #Negamax
+        # Example of using command line param to overwrite depth limit
+        if self.type == 'nm' and param:
+            self.depth_limit = int(param)
+        # window=<n> is the aspiration window half-width (0 turns it off)
+        # pvs=0 turns off principal variation search
+        self.aspiration_window = int(self.options.get('window', ASPIRATION_WINDOW))
+        self.pvs = self.options.get('pvs', '1') == '1'
+
+        #Iterative deepening (alpha-beta and negamax)
+        # id=1 searches to depth 1, 2, 3, ... until the time budget runs out and
+        # plays the best move of the deepest finished search. The depth param then
+        # only caps the depth. budget=<seconds> sets the time budget, otherwise it
+        # is TIME_LIMIT_FRACTION of the game's time limit
+        # (negamax always deepens iteratively, id=1 only adds the time budget)
+        self.iterative_deepening = self.options.get('id', '0') == '1'
+        self.max_depth = int(param) if (self.type in ['ab', 'nm'] and param) else None
+        self.time_budget = float(self.options['budget']) if 'budget' in self.options else None
+        self.deadline = None
+
+        #Move ordering (alpha-beta and negamax)
+        # order=<heuristics> picks from MoveOrdering.HEURISTICS, joined with '+'
+        # (e.g. order=center+killer), or 'all' / 'none'
+        self.move_orderer = MoveOrderer(parse_ordering(self.options.get('order', 'all')))
+        self.stats = SearchStats()
+
+        #Mirror symmetry (alpha-beta, negamax and the array MCTS trees)
+        # symmetry=1 stores a position and its mirror image under one
+        # transposition table key (Position.canonical_hash), and on a symmetric
+        # position searches only one move of each mirrored pair
+        # (Position.unique_moves), e.g. 4 of the 7 first moves
+        self.symmetry = self.options.get('symmetry', '0') == '1'
+
         #Expectimax
         # Example of using command line param to overwrite depth limit
         if self.type == 'expmax' and param:
@@ -34,6 +94,160 @@ class AIPlayer:
         # Example of using command line param to overwrite max-iterations for MCTS
         if self.type == 'mcts' and param:
             self.max_iterations = int(param)
+        # timed=1 runs iterations until the time budget (budget=<seconds>, or
+        # TIME_LIMIT_FRACTION of the game's time limit) runs out. The iterations
+        # param then only caps the number of iterations
+        self.mcts_timed = self.options.get('timed', '0') == '1'
+        self.mcts_iteration_cap = int(param) if (self.type == 'mcts' and param) else None
+        # workers=<K> searches with K processes. With parallel=root (default)
+        # they grow K independent trees (each with the full iteration / time
+        # budget) and their root statistics are merged. With parallel=tree they
+        # grow one tree in shared memory, splitting the iterations between them.
+        # seed=<n> seeds the processes with n, n+1, ... (random otherwise)
+        self.mcts_workers = int(self.options.get('workers', 1))
+        self.mcts_parallel = self.options.get('parallel', 'root')
+        #The root parallel process pool, started on the first move and kept
+        #until close() (created on first use, like the transposition table)
+        self.mcts_pool = None
+        # rollouts=<n> plays n random games (batched with numpy) from every new
+        # leaf and backs up all of them (leaf parallel, array tree only)
+        self.mcts_rollouts = int(self.options.get('rollouts', 1))
+        self.mcts_seed = int(self.options['seed']) if 'seed' in self.options else None
+        # reuse=1 keeps the array tree from one move to the next: the root is
+        # moved down by this player's move and the opponent's reply (found by
+        # comparing the boards), keeping the statistics below them. In the
+        # game's persistent worker the tree stays in memory, otherwise each move
+        # is searched in a new process and the tree waits in a temp file
+        self.mcts_reuse = self.options.get('reuse', '0') == '1'
+        self.mcts_saved_tree = None
+        self.mcts_tree_file = os.path.join(tempfile.gettempdir(), 'mcts_tree_{}_{}_{}.bin'.format(
+            os.getpid(), id(self), player_number))
+        # tree=array (default) keeps the search tree in flat arrays (MCTS.MCTSTree),
+        # tree=nodes uses one MCTSNode object per node
+        self.mcts_tree = self.options.get('tree', 'array')
+
+        #Evaluation function
+        # weights=<w0>/<w1>/<w2>/<w3> scores an open goal state holding 0-3 of the
+        # player's pieces (default all 1: count the open goal states), e.g.
+        # weights=1/2/3/4. Keep 69 * the largest weight below the win score of 300
+        self.eval_weights = parse_weights(self.options.get('weights'))
+        # batch=1 makes alpha-beta and expectimax score all the leaf children of
+        # a node in one batched call (Evaluation.evaluate_bitboards)
+        self.batch_leaves = self.options.get('batch', '0') == '1'
+        # incremental=1 makes alpha-beta and expectimax keep the evaluation up to
+        # date move by move (Evaluation.IncrementalEvaluator) instead of
+        # rescanning the board at every leaf
+        self.incremental_eval = self.options.get('incremental', '0') == '1'
+        self.evaluator = None
+
+        #Transposition table for alpha-beta, negamax and expectimax
+        # tt=<bits> gives the table 2**bits slots (tt=0 turns it off)
+        # replace=<policy> is one of TranspositionTable.REPLACEMENT_POLICIES
+        self.tt_bits = int(self.options.get('tt', 20))
+        self.tt_policy = self.options.get('replace', 'depth')
+        #Created on first use, so the (large) table is not pickled along with
+        #the player when the game hands a move to a worker process
+        self.transposition_table = None
+
+        #Endgame solver (every AI type)
+        # solve=<n> plays perfectly (Solver.Solver) once at most n cells are
+        # empty, instead of searching (0, the default, turns it off).
+        # cache=<path> is the file of solved positions shared between games and
+        # processes (default Solver.DEFAULT_CACHE_PATH, cache=none for no file)
+        self.solve_empties = int(self.options.get('solve', 0))
+        self.solver_cache_path = self.options.get('cache', DEFAULT_CACHE_PATH)
+        #Created on first use, like the transposition table
+        self.solver = None
+
+        #Opening book (every AI type)
+        # book=<path> is a book written by Book.py, looked up before searching
+        # (book=default for Book.DEFAULT_BOOK_PATH). Off unless given, so a
+        # generated book never changes how the players search by itself
+        self.book_path = self.options.get('book')
+        if self.book_path == 'default':
+            self.book_path = DEFAULT_BOOK_PATH
+        if self.book_path is not None:
+            #Checked now, so a bad book fails before the game starts instead of
+            #on the first move
+            try:
+                OpeningBook(self.book_path).close()
+            except OSError as err:
+                raise ValueError('can not open the opening book {} ({})'.format(self.book_path, err.strerror))
+        #Opened on first use (False when there is no book), like the
+        #transposition table, since the memory map can not be pickled
+        self.book = None
+
+        #Set by the game's persistent worker process (a multiprocessing Event):
+        #when the turn's time is up it is set, and searches that can stop early
+        #(iterative deepening, negamax and single tree MCTS) return their best
+        #move so far
+        self.stop_event = None
+
+    def close(self):
+        #Stops the root parallel MCTS pool and removes the files this player
+        #keeps between moves (the MCTS tree saved with reuse=1); called when
+        #the game is over
+        if self.mcts_pool is not None:
+            self.mcts_pool.close()
+            self.mcts_pool.join()
+            self.mcts_pool = None
+        if os.path.exists(self.mcts_tree_file):
+            os.remove(self.mcts_tree_file)
+
+    def get_mcts_pool(self):
+        if self.mcts_pool is None:
+            self.mcts_pool = mp.Pool(self.mcts_workers)
+        return self.mcts_pool
+
+    def get_transposition_table(self):
+        if self.transposition_table is None and self.tt_bits > 0:
+            self.transposition_table = TranspositionTable(self.tt_bits, self.tt_policy)
+        return self.transposition_table
+
+    def out_of_time(self):
+        #True once the deadline has passed or the game has asked the search to stop
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            return True
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    def get_book_move(self, board):
+        #Returns the opening book's move for board, or None if it is not in the book
+        if self.book is None:
+            if self.book_path is None:
+                self.book = False
+            else:
+                self.book = OpeningBook(self.book_path)
+        if not self.book:
+            return None
+        move = self.book.lookup(Position.from_board(board))
+        if move is not None:
+            log.debug('Book move: %s', move)
+        return move
+
+    def get_solver_move(self, board):
+        #Returns the solver's move if the endgame is small enough to solve, otherwise None
+        position = Position.from_board(board)
+        if ROWS * COLS - position.num_moves > self.solve_empties:
+            return None
+        if self.solver is None:
+            cache = None
+            if self.solver_cache_path != 'none':
+                cache = SolverCache(self.solver_cache_path)
+            self.solver = Solver(cache=cache)
+
+        start_time = time.perf_counter()
+        result, move = self.solver.best_move(position, self.player_number)
+        log.debug('Solver: %s with move %s (%s nodes, %.3fs)',
+                  {1: 'win', 0: 'tie', -1: 'loss'}[result], move, self.solver.nodes, time.perf_counter() - start_time)
+        return move
+
+    def get_time_budget(self):
+        #Seconds iterative deepening (or timed MCTS) may spend on a move
+        if self.time_budget is not None:
+            return self.time_budget
+        if self.time_limit:
+            return TIME_LIMIT_FRACTION * self.time_limit
+        return DEFAULT_TIME_BUDGET
 
     def get_alpha_beta_move(self, board):
         """
@@ -55,27 +269,67 @@ class AIPlayer:
         RETURNS:
         The 0 based index of the column that represents the next move
         """
+        #Openings come from the book, small endgames are solved exactly
+        book_move = self.get_book_move(board)
+        if book_move is not None:
+            return book_move
+        solver_move = self.get_solver_move(board)
+        if solver_move is not None:
+            return solver_move
+
         start_time = time.perf_counter()
 
         moves = self.get_working_valid_moves(board)
         best_move = np.random.choice(moves)
-        
+
+        #Search over a bitboard copy of the board
+        position = Position.from_board(board)
+        if self.symmetry:
+            moves = position.unique_moves()
+            best_move = np.random.choice(moves)
+        table = self.get_transposition_table()
+        self.stats = SearchStats()
+        self.move_orderer.new_search()
+        moves = self.move_orderer.order(moves, 0, self.player_number)
+
+        if self.iterative_deepening:
+            best_move, depth_reached = self.get_iterative_deepening_move(position, moves, best_move, start_time)
+        else:
+            best_move, _ = self.get_alpha_beta_root_move(position, moves, best_move)
+
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("-----------------------------------------------------------------------")
+            log.debug(" end of alpha beta move")
+            if self.iterative_deepening:
+                log.debug("Depth reached: " + str(depth_reached))
+            log.debug("best_move: " + str(best_move))
+            log.debug("search stats: " + self.stats.summary())
+            if table is not None:
+                log.debug("transposition table hit rate: " + str(table.hit_rate()))
+            end_time = time.perf_counter()
+
+            log.debug("time taken to find move: " + str(end_time - start_time))
+        return best_move
+
+    def get_alpha_beta_root_move(self, position, moves, best_move):
+        #Searches every move in moves to self.depth_limit and returns the best
+        #one (best_move if none is better) and its value
         depth = 0
+        self.start_incremental_evaluation(position)
 
         #YOUR ALPHA-BETA CODE GOES HERE
         minmax = [-1 * np.inf, np.inf]
         for move in moves:
             #don't check above what we are currently deciding
-            #make new board and execute the move
-            newBoard = [[0] * 7 for _ in range(6)]
-            #create a new board
-            #copy board values
-            for row in range(0, 6):
-                for col in range(0, 7):
-                    newBoard[row][col] = board[row][col]
-            make_move(newBoard, move, self.player_number)
-
-            value = self.get_recursive_alpha_beta_move(newBoard, self.other_player_number, depth + 1, minmax)
+            #execute the move on the position (taken back below, so no copy is needed)
+            if self.evaluator is not None:
+                self.evaluator.make_move(position.heights[move], self.player_number)
+            position.make_move(move, self.player_number)
+
+            value = self.get_recursive_alpha_beta_move(position, self.other_player_number, depth + 1, minmax)
+            position.unmake_move()
+            if self.evaluator is not None:
+                self.evaluator.unmake_move()
             
             if (self.player_number == 1 and value > minmax[0]):
                 minmax[0] = value
@@ -83,16 +337,98 @@ class AIPlayer:
             elif (self.player_number == 2 and value < minmax[1]):
                 minmax[1] = value
                 best_move = move
-        
 
-        print("-----------------------------------------------------------------------")
-        print(" end of alpha beta move")
-        print("best_move: " + str(best_move))
-        end_time = time.perf_counter()
+        if (self.player_number == 1):
+            return best_move, minmax[0]
+        return best_move, minmax[1]
+
+    def get_iterative_deepening_move(self, position, moves, best_move, start_time):
+        #Runs alpha-beta to depth 1, 2, 3, ... until the time budget runs out.
+        #Returns the best move of the deepest search that finished, and that depth
+        budget = self.get_time_budget()
+        self.deadline = start_time + budget
+
+        #No point searching past the end of the game
+        max_depth = 42 - position.num_moves
+        if self.max_depth is not None:
+            max_depth = min(max_depth, self.max_depth)
+
+        depth_limit = self.depth_limit
+        depth_reached = 0
+        try:
+            for depth in range(1, max_depth + 1):
+                self.depth_limit = depth
+                #Search the previous iteration's best move first
+                ordered_moves = [best_move] + [m for m in moves if m != best_move]
+                best_move, value = self.get_alpha_beta_root_move(position, ordered_moves, best_move)
+                depth_reached = depth
+
+                #Stop once the game is decided, or when the next (deeper) search
+                #would most likely not finish in the time that is left
+                if abs(value) >= 300 or time.perf_counter() - start_time > budget / 2:
+                    break
+        except SearchTimeout:
+            #Out of time part way through a depth: keep the last finished result
+            pass
+        finally:
+            self.depth_limit = depth_limit
+            self.deadline = None
+
+        return best_move, depth_reached
+    
+    def get_negamax_move(self, board):
+        """
+        Given the current state of the board, return the next move based on
+        negamax alpha-beta with principal variation search and aspiration
+        windows (see Negamax.py)
+
+        INPUTS:
+        board - a numpy array containing the state of the board using the
+                following encoding:
+                - the board maintains its same two dimensions
+                    - row 0 is the top of the board and so is
+                      the last row filled
+                - spaces that are unoccupied are marked as 0
+                - spaces that are occupied by player 1 have a 1 in them
+                - spaces that are occupied by player 2 have a 2 in them
+
+        RETURNS:
+        The 0 based index of the column that represents the next move
+        """
+        #Openings come from the book, small endgames are solved exactly
+        book_move = self.get_book_move(board)
+        if book_move is not None:
+            return book_move
+        solver_move = self.get_solver_move(board)
+        if solver_move is not None:
+            return solver_move
+
+        start_time = time.perf_counter()
+
+        position = Position.from_board(board)
+        search = NegamaxSearch(self.evaluate_position, self.get_transposition_table(), self.move_orderer,
+                               self.aspiration_window, self.pvs, self.stop_event, self.symmetry)
 
-        print("time taken to find move: " + str(end_time - start_time))
+        if self.iterative_deepening:
+            max_depth = self.max_depth if self.max_depth is not None else 42
+            deadline = start_time + self.get_time_budget()
+        else:
+            max_depth = self.depth_limit
+            deadline = None
+        best_move, score, depth_reached = search.search(position, self.player_number, max_depth, deadline)
+        self.stats = search.stats
+
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("-----------------------------------------------------------------------")
+            log.debug(" end of negamax move")
+            log.debug("Depth reached: " + str(depth_reached))
+            log.debug("best_move: " + str(best_move) + " score: " + str(score))
+            log.debug("search stats: " + self.stats.summary())
+            end_time = time.perf_counter()
+
+            log.debug("time taken to find move: " + str(end_time - start_time))
         return best_move
-    
+
     def get_working_valid_moves(self, board):
         valid_moves = []
         #columns
@@ -105,7 +441,14 @@ class AIPlayer:
         
     
     #return a move
-    def get_recursive_alpha_beta_move(self, board, player_num, depth, parent_range):
+    def get_recursive_alpha_beta_move(self, position, player_num, depth, parent_range):
+        #Count nodes, and give up if iterative deepening is out of time
+        stats = self.stats
+        stats.nodes += 1
+        if self.deadline is not None and stats.nodes % NODES_PER_TIME_CHECK == 0:
+            if self.out_of_time():
+                raise SearchTimeout()
+
         # returns a tuple with (action, value associated).
         # Actions that are closer to a goal will return a higher absolute value.
         # Goal states will have the highest absolute value of any state
@@ -119,60 +462,120 @@ class AIPlayer:
         # Max number of goal states = 24 + 21 + 24 = 69 (nice!)
         # Note: can also get two goal states at the same time (diagonal and vertical for example)
 
-        #base case: one player wins
-        if (is_winning_state(board, player_num)):
-            #return the max value for the current player
-            if (player_num == 1):
+        #base case: the player who just moved wins
+        #(only the lines through the last piece dropped need to be checked)
+        if (position.last_move_wins()):
+            #return the max value for the player who made the winning move
+            if (player_num == 2):
                 #hi there
                 return 300
-            elif (player_num == 2):
+            elif (player_num == 1):
                 return -300
 
         #base case: tie
-        if (get_valid_moves(board) == None):
+        if (position.is_full()):
             #return the tie value (not negative or positive)
             return 0
         
         if (depth >= self.depth_limit):
             #if we are stopping give our best guess for the current state of the board
-            return self.evaluation_function(board)
+            return self.evaluate_position(position)
+
+        #transposition table: reuse the result of an earlier search of this
+        #position that went at least as deep as we still have to go
+        remaining = self.depth_limit - depth
+        table = self.transposition_table
+        hash_move = None
+        if table is not None:
+            #with symmetry, a position and its mirror image share an entry whose
+            #move is stored for the one with the smaller hash
+            if self.symmetry:
+                key, mirrored = position.canonical_hash()
+            else:
+                key, mirrored = position.hash, False
+            entry = table.probe(key)
+            if entry is not None:
+                value, entry_depth, flag, entry_move = entry
+                if entry_depth >= remaining:
+                    if flag == EXACT:
+                        stats.tt_cutoffs += 1
+                        return value
+                    #a bound is good enough when it would make the parent skip this node anyway
+                    if flag == LOWER and player_num == 1 and value > parent_range[1]:
+                        stats.tt_cutoffs += 1
+                        return value
+                    if flag == UPPER and player_num == 2 and value < parent_range[0]:
+                        stats.tt_cutoffs += 1
+                        return value
+                #otherwise the stored best move is still a good first guess
+                if entry_move >= 0:
+                    hash_move = mirror_move(entry_move) if mirrored else entry_move
         
-        moves = get_valid_moves(board)
+        validMoves = position.unique_moves() if self.symmetry else position.get_valid_moves()
+        moves = self.move_orderer.order(validMoves, depth, player_num, hash_move)
+        stats.interior_nodes += 1
+
+        #batched evaluation: when the children are leaves, score them all at once
+        leafValues = None
+        if self.batch_leaves and depth + 1 >= self.depth_limit:
+            leafValues = self.evaluate_children(position, moves, player_num)
+            stats.nodes += len(moves)
+
         minmax = [-1 * np.inf, np.inf]
-        for move in moves:
+        best_move = None
+        pruned = False
+        for index, move in enumerate(moves):
 
+            #once the parent will not pick this node, the remaining moves can be skipped
             if (minmax[0] != -1 * np.inf and player_num == 1 and minmax[0] > parent_range[1]):
-                #skip if the ranges do not coorespond
-                continue
+                pruned = True
             elif (minmax[1] != np.inf and player_num == 2 and minmax[1] < parent_range[0]):
-                #skip if the ranges do not coorespond
-                continue
+                pruned = True
+            if pruned:
+                stats.cutoffs += 1
+                if index == 1:
+                    stats.first_move_cutoffs += 1
+                self.move_orderer.record_cutoff(best_move, depth, player_num, remaining)
+                break
 
-            #make new board and execute the move
-            newBoard = [[0] * 7 for _ in range(6)]
-            #copy board values
-            for row in range(0, 6):
-                for col in range(0, 7):
-                    newBoard[row][col] = board[row][col]
-            make_move(newBoard, move, player_num)
+            if leafValues is not None:
+                value = leafValues[move]
+            else:
+                #execute the move on the position (taken back below, so no copy is needed)
+                if self.evaluator is not None:
+                    self.evaluator.make_move(position.heights[move], player_num)
+                position.make_move(move, player_num)
 
-            #get the value of the new move
-            otherPlayer = None
-            if (player_num == 1):
-                otherPlayer = 2
-            if (player_num == 2):
-                otherPlayer = 1
-            value = self.get_recursive_alpha_beta_move(newBoard, otherPlayer, depth + 1, minmax)
+                #get the value of the new move
+                otherPlayer = None
+                if (player_num == 1):
+                    otherPlayer = 2
+                if (player_num == 2):
+                    otherPlayer = 1
+                value = self.get_recursive_alpha_beta_move(position, otherPlayer, depth + 1, minmax)
+                position.unmake_move()
+                if self.evaluator is not None:
+                    self.evaluator.unmake_move()
 
             if (player_num == 1 and value > minmax[0]):
                 minmax[0] = value
+                best_move = move
             elif (player_num == 2 and value < minmax[1]):
                 minmax[1] = value
-        
-        if (player_num == 1):
-            return minmax[0]
-        elif (player_num == 2):
-            return minmax[1]
+                best_move = move
+
+        value = minmax[0] if player_num == 1 else minmax[1]
+        if table is not None:
+            #skipped moves could only have made the value better for the player
+            #to move, so a pruned node only gives a bound
+            if not pruned:
+                flag = EXACT
+            elif player_num == 1:
+                flag = LOWER
+            else:
+                flag = UPPER
+            table.store(key, value, remaining, flag, mirror_move(best_move) if mirrored else best_move)
+        return value
             
 
             
@@ -186,27 +589,114 @@ class AIPlayer:
         Use MCTS to get the next move
         """
 
+        #Openings come from the book, small endgames are solved exactly
+        book_move = self.get_book_move(board)
+        if book_move is not None:
+            return book_move
+        solver_move = self.get_solver_move(board)
+        if solver_move is not None:
+            return solver_move
+
+        start_time = time.perf_counter()
+
         #How many iterations of MCTS will we do?
-        max_iterations = 1000 #Modify to work for you
+        if self.mcts_timed:
+            #As many as fit in the time budget (up to the param, if one was given)
+            max_iterations = self.mcts_iteration_cap
+            deadline = start_time + self.get_time_budget()
+        else:
+            max_iterations = self.max_iterations
+            deadline = None
+
+        if self.mcts_workers > 1:
+            position = Position.from_board(board)
+            if self.mcts_parallel == 'tree':
+                #Tree parallel: every worker process grows the same shared tree
+                children, best_move, iterations = tree_parallel_search(
+                    position, self.player_number, self.mcts_workers,
+                    max_iterations, deadline, self.mcts_seed, symmetry=self.symmetry)
+            else:
+                #Root parallel: one array-backed tree per worker process
+                children, best_move, iterations = root_parallel_search(
+                    position, self.player_number, self.mcts_workers,
+                    max_iterations, deadline, self.mcts_seed, self.mcts_rollouts, self.symmetry,
+                    self.get_mcts_pool())
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug('Workers: %s %s parallel', self.mcts_workers, self.mcts_parallel)
+                log.debug('Total Node visits and wins: %s %s', sum(n for _, n, _ in children), sum(w for _, _, w in children))
+                log.debug('Children: ')
+                for move, n, w in children:
+                    log.debug('    %s : %s %s', move, n, w)
+        elif self.mcts_tree == 'array':
+            #Array-backed tree: no per-node objects or boards
+            position = Position.from_board(board)
+            tree = self.get_reused_tree(position) if self.mcts_reuse else None
+            if tree is None:
+                tree = MCTSTree(position, self.player_number, batch=self.mcts_rollouts, symmetry=self.symmetry)
+            else:
+                log.debug('Reused tree: %s visits, %s nodes', tree.visits[0], tree.size)
+            iterations = tree.run(max_iterations, deadline, self.stop_event)
+            if log.isEnabledFor(logging.DEBUG):
+                tree.print_root()
+            best_move = tree.max_child()
+            if self.mcts_reuse:
+                self.mcts_saved_tree = tree
+                if self.stop_event is None:
+                    #This process ends after the move, keep the tree in a file
+                    tree.save(self.mcts_tree_file)
+        else:
+            #Make the MCTS root node from the current board state
+            root = MCTSNode(Position.from_board(board), self.player_number, None)
 
-        #Make the MCTS root node from the current board state
-        root = MCTSNode(board, self.player_number, None)
+            #Run our MCTS iterations
+            iterations = 0
+            while max_iterations is None or iterations < max_iterations:
 
-        #Run our MCTS iterations
-        for i in range(max_iterations):
+                #Select + Expand
+                cur_node = root.select()
 
-            #Select + Expand
-            cur_node = root.select()
-            
-            #Simulate + backpropate
-            cur_node.simulate()
+                #Simulate + backpropate
+                cur_node.simulate()
 
-        #Print out the info from the root node
-        root.print_node()
-        # #Debug TODO:get rid of
-        # root.print_tree()
-        print('MCTS chooses action', root.max_child())
-        return root.max_child()
+                iterations += 1
+                if iterations % ITERATIONS_PER_TIME_CHECK == 0:
+                    if deadline is not None and time.perf_counter() > deadline:
+                        break
+                    if self.stop_event is not None and self.stop_event.is_set():
+                        break
+
+            #Print out the info from the root node
+            if log.isEnabledFor(logging.DEBUG):
+                root.print_node()
+            # #Debug TODO:get rid of
+            # root.print_tree()
+            best_move = root.max_child()
+
+        if log.isEnabledFor(logging.DEBUG):
+            elapsed = time.perf_counter() - start_time
+            log.debug('MCTS iterations: {}, time: {:.3f}s, iterations per second: {:.0f}'.format(
+                iterations, elapsed, iterations / elapsed if elapsed > 0 else 0.0))
+            if self.mcts_rollouts > 1 and self.mcts_tree == 'array' and self.mcts_parallel != 'tree':
+                log.debug('MCTS rollouts: {}, rollouts per second: {:.0f}'.format(
+                    iterations * self.mcts_rollouts, iterations * self.mcts_rollouts / elapsed if elapsed > 0 else 0.0))
+            log.debug('MCTS chooses action %s', best_move)
+        return best_move
+
+    def get_reused_tree(self, position):
+        #Returns the tree saved after this player's last move, moved down to
+        #position, or None if there is nothing to reuse
+        tree = self.mcts_saved_tree
+        if tree is None:
+            if not os.path.exists(self.mcts_tree_file):
+                return None
+            tree = MCTSTree.load(self.mcts_tree_file, batch=self.mcts_rollouts, symmetry=self.symmetry)
+            #The tree is in memory now, and is saved again after this move
+            os.remove(self.mcts_tree_file)
+        moves = played_moves(tree.position, position, tree.player_number)
+        #This player must be the one to move again
+        if tree.player_number != self.player_number or moves is None or len(moves) % 2:
+            return None
+        return tree.advance(moves)
 
     def get_expectimax_move(self, board):
         """
@@ -230,6 +720,14 @@ class AIPlayer:
         The 0 based index of the column that represents the next move
         """
         
+        #Openings come from the book, small endgames are solved exactly
+        book_move = self.get_book_move(board)
+        if book_move is not None:
+            return book_move
+        solver_move = self.get_solver_move(board)
+        if solver_move is not None:
+            return solver_move
+
         start_time = time.perf_counter()
 
         moves = self.get_working_valid_moves(board)
@@ -237,20 +735,24 @@ class AIPlayer:
         
         depth = 0
 
+        #Search over a bitboard copy of the board
+        position = Position.from_board(board)
+        table = self.get_transposition_table()
+        self.start_incremental_evaluation(position)
+
         #YOUR ALPHA-BETA CODE GOES HERE
         minmax = [-1 * np.inf, np.inf]
         for move in moves:
             #don't check above what we are currently deciding
-            #make new board and execute the move
-            newBoard = [[0] * 7 for _ in range(6)]
-            #create a new board
-            #copy board values
-            for row in range(0, 6):
-                for col in range(0, 7):
-                    newBoard[row][col] = board[row][col]
-            make_move(newBoard, move, self.player_number)
-
-            value = self.get_recursive_expectimax_move(newBoard, self.other_player_number, depth + 1, minmax)
+            #execute the move on the position (taken back below, so no copy is needed)
+            if self.evaluator is not None:
+                self.evaluator.make_move(position.heights[move], self.player_number)
+            position.make_move(move, self.player_number)
+
+            value = self.get_recursive_expectimax_move(position, self.other_player_number, depth + 1, minmax)
+            position.unmake_move()
+            if self.evaluator is not None:
+                self.evaluator.unmake_move()
             
             if (self.player_number == 1 and value > minmax[0]):
                 minmax[0] = value
@@ -260,16 +762,19 @@ class AIPlayer:
                 best_move = move
         
 
-        print("-----------------------------------------------------------------------")
-        print(" end of expectimax move")
-        print("Depth limit: " + str(self.depth_limit))
-        print("best_move: " + str(best_move))
-        end_time = time.perf_counter()
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("-----------------------------------------------------------------------")
+            log.debug(" end of expectimax move")
+            log.debug("Depth limit: " + str(self.depth_limit))
+            log.debug("best_move: " + str(best_move))
+            if table is not None:
+                log.debug("transposition table hit rate: " + str(table.hit_rate()))
+            end_time = time.perf_counter()
 
-        print("time taken to find move: " + str(end_time - start_time))
+            log.debug("time taken to find move: " + str(end_time - start_time))
         return best_move
 
-    def get_recursive_expectimax_move(self, board, player_num, depth, parent_range):
+    def get_recursive_expectimax_move(self, position, player_num, depth, parent_range):
         # returns a tuple with (action, value associated).
         # Actions that are closer to a goal will return a higher absolute value.
         # Goal states will have the highest absolute value of any state
@@ -295,63 +800,77 @@ class AIPlayer:
             otherPlayer = 1
 
         #base case: one player wins
-        if (is_winning_state(board, player_num)):
-            #return the max value for the current player
-            if (player_num == 1):
-                #hi there
-                return highestVal
-            elif (player_num == 2):
-                return lowestVal
-        #prevent unnecessary depth with a check for the other player winning
-        if (is_winning_state(board, otherPlayer)):
+        #The search stops as soon as someone wins, so only the player who just
+        #moved (otherPlayer) can have won, through the piece they dropped
+        if (position.last_move_wins()):
             if (otherPlayer == 1):
                 return highestVal
             elif (otherPlayer == 2):
                 return lowestVal
 
         #base case: tie
-        if (get_valid_moves(board) == None):
+        if (position.is_full()):
             #return the tie value (not negative or positive)
             return 0
         
         #base case: hit depth limit
         if (depth >= self.depth_limit):
             #if we are stopping give our best guess for the current state of the board
-            return self.evaluation_function(board)
+            return self.evaluate_position(position)
 
         #----------------------------------------------------#
+
+        #transposition table: reuse an earlier search of this position that
+        #went at least as deep as we still have to go
+        remaining = self.depth_limit - depth
+        table = self.transposition_table
+        if table is not None:
+            entry = table.probe(position.hash)
+            if entry is not None and entry[1] >= remaining and entry[2] == EXACT:
+                return entry[0]
         
-        moves = get_valid_moves(board)
+        moves = position.get_valid_moves()
         minmax = [-1 * np.inf, np.inf]
         #get the values and associated probabilities for each decision
-        probs = [1.0 / len(moves)] * len(board[0])
-        highVals = [np.inf] * len(board[0])
-        lowVals = [-np.inf] * len(board[0])
+        probs = [1.0 / len(moves)] * COLS
+        highVals = [np.inf] * COLS
+        lowVals = [-np.inf] * COLS
         exploredMoves = []
         highValAvg = 0
         lowValAvg = 0
+        pruned = False
+
+        #batched evaluation: when the children are leaves, score them all at once
+        leafValues = None
+        if self.batch_leaves and depth + 1 >= self.depth_limit:
+            leafValues = self.evaluate_children(position, moves, player_num)
+
         for move in moves:
 
             #skip if the ranges do not coorespond
             if (minmax[0] != -1 * np.inf and minmax[0] > parent_range[1]):
+                pruned = True
                 continue
             elif (minmax[1] != np.inf and minmax[1] < parent_range[0]):
+                pruned = True
                 continue
 
             #mark moves that we are exploring
             exploredMoves.append(move)
 
-            #make new board and execute the move
-            newBoard = [[0] * 7 for _ in range(6)]
-            #copy board values
-            for row in range(0, 6):
-                for col in range(0, 7):
-                    newBoard[row][col] = board[row][col]
-            #update board
-            make_move(newBoard, move, player_num)
+            if leafValues is not None:
+                value = leafValues[move]
+            else:
+                #execute the move on the position (taken back below, so no copy is needed)
+                if self.evaluator is not None:
+                    self.evaluator.make_move(position.heights[move], player_num)
+                position.make_move(move, player_num)
 
-            #get the value of the new move
-            value = self.get_recursive_expectimax_move(newBoard, otherPlayer, depth + 1, minmax)
+                #get the value of the new move
+                value = self.get_recursive_expectimax_move(position, otherPlayer, depth + 1, minmax)
+                position.unmake_move()
+                if self.evaluator is not None:
+                    self.evaluator.unmake_move()
 
             #update the expectimax value
             if (player_num == self.player_number):
@@ -392,12 +911,18 @@ class AIPlayer:
         if (player_num == self.player_number):
             #use alpha beta
             if (player_num == 1):
-                return minmax[0]
+                value = minmax[0]
             elif (player_num == 2):
-                return minmax[1]
+                value = minmax[1]
         elif (player_num == self.other_player_number):
             #use random, if children are pruned this value should not affect the parent node
-            return highValAvg
+            value = highValAvg
+
+        #a pruned node's value is not a clean bound at chance nodes, so only
+        #fully searched nodes are stored
+        if table is not None and not pruned:
+            table.store(position.hash, value, remaining, EXACT)
+        return value
 
 
     def evaluation_function(self, board):
@@ -444,134 +969,84 @@ class AIPlayer:
         # prefer positions closer to the middle of the board (more possible combinations)
 
 
-        #return max values for a winning state
-        if is_winning_state(board, 1):
-            #return max evaluation value
+        #Every goal state is scored at once over the precomputed window table
+        #(see Evaluation.py); open goal states are weighted by how many of the
+        #player's pieces they already hold.
+        #This is the numpy board interface for callers outside the searches.
+        #The searches score their leaves with evaluate_position (or
+        #evaluate_children when batching), which give the same values straight
+        #from the bitboards.
+        return evaluate_board(board, self.eval_weights)
+
+    def start_incremental_evaluation(self, position):
+        #Sets up self.evaluator to follow a search from position (when enabled)
+        if self.incremental_eval:
+            if self.evaluator is None:
+                self.evaluator = IncrementalEvaluator(self.eval_weights)
+            self.evaluator.reset(position)
+
+    def evaluate_children(self, position, moves, player_num):
+        """
+        Scores every child of position (player_num playing each of moves) as
+        a leaf, evaluating all of the non-terminal children in one batched
+        call instead of one evaluate_position call each
+
+        RETURNS:
+        A dict from move to the child's value, the same value the search's
+        base cases would give it at the depth limit
+        """
+        values = dict()
+        pieces1 = []
+        pieces2 = []
+        batchMoves = []
+        winValue = 300 if player_num == 1 else -300
+        for move in moves:
+            if position.is_winning_move(move, player_num):
+                values[move] = winValue
+            elif position.num_moves + 1 == 42:
+                values[move] = 0
+            else:
+                #the child's pieces, without making the move
+                bit = 1 << position.heights[move]
+                if player_num == 1:
+                    pieces1.append(position.pieces[1] | bit)
+                    pieces2.append(position.pieces[2])
+                else:
+                    pieces1.append(position.pieces[1])
+                    pieces2.append(position.pieces[2] | bit)
+                batchMoves.append(move)
+
+        if batchMoves:
+            scores = evaluate_bitboards(pieces1, pieces2, self.eval_weights)
+            for move, score in zip(batchMoves, scores.tolist()):
+                values[move] = score
+        return values
+
+    def evaluate_position(self, position):
+        """
+        Bitboard version of evaluation_function, used by the searches
+
+        A goal state is still available to a player when none of its 4 cells
+        hold a piece of the other player, so each of the 69 goal states is a
+        single mask test instead of a walk over its cells.
+        (For one position this beats numpy, which pays its call overhead on
+        every leaf.)
+
+        INPUTS:
+        position - a Bitboard.Position
+
+        RETURNS:
+        The utility value for the position (same scale as evaluation_function)
+        """
+        if position.is_winning(1):
             return 300
-        elif is_winning_state(board, 2):
+        elif position.is_winning(2):
             return -300
-        
-        #Implementing most possible wins evaluation
-        numGoalsFor1 = 0
-        numGoalsFor2 = 0
-        #columns
-        for currCol in range(0, 7):
-            #possible start rows
-            for startR in range(0, 3):
-                #for every goal list
-
-                filled1Positions = 0
-                filled2Positions = 0
-                isGoal1 = True #assume this goalList is all 0's
-                isGoal2 = True
-                for goalOffsetR in range(3, -1, -1):
-                    #go backwards, if we encounter a 0, the rest are also 0
-                    goalPosR = startR + goalOffsetR
-                    posVal = board[goalPosR][currCol]
-                    if (posVal == 1):
-                        #filled1Positions += 1
-                        isGoal2 = False
-                    elif (posVal == 2):
-                        #filled2Positions += 1
-                        isGoal1 = False
-                    else:
-                        #value of 0
-                        break
-                    if isGoal2 == False and isGoal1 == False:
-                        #no valid goal, go to next goal list
-                        break
 
-                #add the valid goals to the total
-                if isGoal1 == True:
-                    numGoalsFor1 += 1
-                if isGoal2 == True:
-                    numGoalsFor2 += 1
-        
-        #rows
-        for currRow in range(0, 6):
-            #possible start cols
-            for startC in range(0, 4):
-                #for every goal list
-
-                filled1Positions = 0
-                filled2Positions = 0
-                isGoal1 = True #assume this goalList is all 0's
-                isGoal2 = True
-                for goalOffsetC in range(0, 4):
-                    goalPosC = startC + goalOffsetC
-                    posVal = board[currRow][goalPosC]
-                    #if invalid position for a player
-                    if (posVal == 1):
-                        isGoal2 = False
-                    if (posVal == 2):
-                        isGoal1 = False
-                    
-                    if isGoal1 == False and isGoal2 == False:
-                        break
-                
-                #add the valid goals to the total
-                if isGoal1 == True:
-                    numGoalsFor1 += 1
-                if isGoal2 == True:
-                    numGoalsFor2 += 1
-        
-        #diagonals (top left to bottom right)
-        for startRow in range(0, 3):
-            for startCol in range(0, 4):
-                #if invalid position for a player mark it as so
-                filled1Positions = 0
-                filled2Positions = 0
-                isGoal1 = True #assume this goalList is all 0's
-                isGoal2 = True
-                #for each top left to down right goal list
-                for tokenNum in range(0, 4):
-                    goalPosR = startRow + tokenNum
-                    goalPosC = startCol + tokenNum
-                    posVal = board[goalPosR][goalPosC]
-                    #if invalid position for a player
-                    if (posVal == 1):
-                        isGoal2 = False
-                    if (posVal == 2):
-                        isGoal1 = False
-                    
-                    if isGoal1 == False and isGoal2 == False:
-                        break
-                #add the valid goals to the total
-                if isGoal1 == True:
-                    numGoalsFor1 += 1
-                if isGoal2 == True:
-                    numGoalsFor2 += 1
-
-        #diagonals (bottom left to top right)
-        for startRow in range(0, 3):
-            for startCol in range(0, 4):
-                #if invalid position for a player mark it as so
-                filled1Positions = 0
-                filled2Positions = 0
-                isGoal1 = True #assume this goalList is all 0's
-                isGoal2 = True
-
-                #for each down left to top right goal list
-                oppositeRow = 5 - startRow
-                for tokenNum in range(0, 4):
-                    goalPosR = oppositeRow - tokenNum
-                    goalPosC = startCol + tokenNum
-                    posVal = board[goalPosR][goalPosC]
-                    #if invalid position for a player
-                    if (posVal == 1):
-                        isGoal2 = False
-                    if (posVal == 2):
-                        isGoal1 = False
-                    
-                    if isGoal1 == False and isGoal2 == False:
-                        break
-                #add the valid goals to the total
-                if isGoal1 == True:
-                    numGoalsFor1 += 1
-                if isGoal2 == True:
-                    numGoalsFor2 += 1
-
-        return numGoalsFor1 - numGoalsFor2
+        if self.evaluator is not None:
+            #kept up to date by the search, see start_incremental_evaluation
+            return self.evaluator.score
+        return evaluate_bits(position.pieces[1], position.pieces[2], self.eval_weights)
 
 
 class RandomPlayer:
@@ -647,13 +1122,16 @@ class HumanPlayer:
 
 #CODE FOR MCTS 
 class MCTSNode:
-    def __init__(self, board, player_number, parent):
-        self.board = board
+    def __init__(self, position, player_number, parent):
+        #position is a Bitboard.Position owned by this node
+        self.position = position
         self.player_number = player_number
         self.other_player_number = 1 if player_number == 2 else 2
         self.parent = parent
-        self.moves = get_valid_moves(board)
-        self.terminal = (len(self.moves) == 0) or is_winning_state(board, player_number) or is_winning_state(board, self.other_player_number)
+        self.moves = position.get_valid_moves()
+        #Whether the move into this node (made by self.other_player_number) won the game
+        self.won = position.last_move_wins()
+        self.terminal = (len(self.moves) == 0) or self.won
         self.children = dict()
         for m in self.moves:
             self.children[m] = None
@@ -673,23 +1151,24 @@ class MCTSNode:
     
 
     def print_tree(self):
-        #Debugging utility that will print the whole subtree starting at this node
-        print("****")
+        #Debugging utility that will log the whole subtree starting at this node
+        log.debug("****")
         self.print_node()
         for m in self.moves:
             if self.children[m]:
                 self.children[m].print_tree()
-        print("****")
+        log.debug("****")
 
     def print_node(self):
-        #Debugging utility that will print this node's information
-        print('Total Node visits and wins: ', self.n, self.w)
-        print('Children: ')
+        #Debugging utility that will log this node's information
+        log.debug('Total Node visits and wins: %s %s', self.n, self.w)
+        log.debug('Children: ')
         for m in self.moves:
             if self.children[m] is None:
-                print('   ', m, ' is None')
+                log.debug('    %s  is None', m)
             else:
-                print('   ', m, ':', self.children[m].n, self.children[m].w, 'UB: ', self.children[m].upper_bound(self.n))
+                log.debug('    %s : %s %s UB:  %s', m, self.children[m].n, self.children[m].w,
+                          self.children[m].upper_bound(self.n))
 
     def max_child(self):
         #Return the most visited child
@@ -714,8 +1193,8 @@ class MCTSNode:
             mean = self.w / self.n
             deviation = self.c * (math.sqrt(math.log(N, math.e)) / self.n)
         else:
-            print("N:" + str(N))
-            print("c:" + str(self.c))
+            log.debug("N:" + str(N))
+            log.debug("c:" + str(self.c))
             mean = self.w
             deviation = self.c * (math.sqrt(math.log(N, math.e)))
 
@@ -740,10 +1219,10 @@ class MCTSNode:
         for m in self.moves:
             if self.children[m] is None:
                 #If this child doesn't exist, then create it and return it
-                new_board = np.copy(self.board) #Copy board/state for the new child
-                make_move(new_board,m,self.player_number) #Make the move in the state
+                new_position = self.position.copy() #Copy board/state for the new child
+                new_position.make_move(m, self.player_number) #Make the move in the state
 
-                self.children[m] = MCTSNode(new_board, self.other_player_number, self) #Create the child node
+                self.children[m] = MCTSNode(new_position, self.other_player_number, self) #Create the child node
                 return self.children[m] #Return it
 
             #Child already exists, get it's UCB value
@@ -772,15 +1251,15 @@ class MCTSNode:
         # Else-if this state is terminal AND is a winning state for self.player_number
         #   Then we are done and the result is -1 (since this is from parent's perspective)
 
-        if self.terminal and is_winning_state(self.board, self.other_player_number):
+        if self.terminal and self.won:
             self.n += 1
             self.w += 1
             return 1
-        elif self.terminal and is_winning_state(self.board, self.player_number):
+        elif self.terminal and self.position.is_winning(self.player_number):
             self.n += 1
             self.w += -1
             return -1
-        elif self.terminal and len(get_valid_moves(self.board)) == 0:
+        elif self.terminal and self.position.is_full():
             #terminal state ending in a tie
             self.n += 1
             self.w += 0
@@ -789,8 +1268,10 @@ class MCTSNode:
         #
         # Else-if this is not a terminal state (if it is terminal and a tie (no-one won, then result is 0))
         #   Then we need to perform the random rollout
-        #      1. Make a copy of the board to modify
-        newBoard = copy_board(self.board)
+        #      1. Play the rollout on this node's position, taking the moves back
+        #         afterwards, rather than copying it
+        position = self.position
+        rolloutMoves = 0
         #      2. Keep track of which player's turn it is (first turn is current nodes self.player_number)
 
         #      3. Until the game is over: 
@@ -804,19 +1285,20 @@ class MCTSNode:
         gameValue = 0
         while (True):
             #Make random move for player
-            moves = get_valid_moves(newBoard)
+            moves = position.get_valid_moves()
             randInd = random.randint(0, len(moves) - 1)
             randMove = moves[randInd]
-            make_move(newBoard, randMove, playerNum)
+            position.make_move(randMove, playerNum)
+            rolloutMoves += 1
 
             #Check for winning condition
-            if is_winning_state(newBoard, playerNum):
+            if position.last_move_wins():
                 if playerNum == self.player_number:
                     gameValue = -1
                 else:
                     gameValue = 1
                 break
-            elif len(get_valid_moves(newBoard)) == 0:
+            elif position.is_full():
                 #terminal state ending in a tie
                 gameValue = 0
                 break
@@ -827,6 +1309,10 @@ class MCTSNode:
             elif playerNum == 2:
                 playerNum = 1
 
+        #Restore this node's position
+        for i in range(rolloutMoves):
+            position.unmake_move()
+
         # Update this node's total reward (self.w) and visit count (self.n) values to reflect this visit and result
         self.n += 1
         self.w += gameValue
@@ -849,196 +1335,18 @@ class MCTSNode:
 
 #UTILITY FUNCTIONS
 
-#This function will modify the board according to 
-#player_number moving into move column
-def make_move(board,move,player_number):
-    emptyrow = -1
-    for row in range(5, -1, -1):
-        if (board[row][move] == 0):
-            emptyrow = row
-            break
-    if emptyrow != -1:
-        board[emptyrow][move] = player_number
-
-#This function will return a list of valid moves for the given board
-def get_valid_moves(board):
-    valid_moves = []
-    for c in range(7):
-        for r in range(6):
-            if 0 == board[r][c]:
-                valid_moves.append(c)
-                break
-    return valid_moves
-
-#This function returns true if player_num is winning on board
-def is_winning_state(board, player_num):
-    #Check if winning for...
-
-    #columns
-    for currCol in range(0, 7):
-        #possible start rows
-        for startR in range(0, 3):
-            #for every goal list
-
-            isGoal1 = True #assume this goalList is all 0's
-            isGoal2 = True
-            for goalOffsetR in range(3, -1, -1):
-                #go backwards, if we encounter a 0, the rest are also 0
-                goalPosR = startR + goalOffsetR
-                posVal = board[goalPosR][currCol]
-                if (posVal == 1):
-                    #filled1Positions += 1
-                    isGoal2 = False
-                elif (posVal == 2):
-                    #filled2Positions += 1
-                    isGoal1 = False
-                else:
-                    isGoal1 = False
-                    isGoal2 = False
-
-                if isGoal1 == False and isGoal2 == False:
-                    break
-
-            #add the valid goals to the total
-            if isGoal1 == True and player_num == 1:
-                return True
-            if isGoal2 == True and player_num == 2:
-                return True
-    
-    #rows
-    for currRow in range(0, 6):
-        #possible start cols
-        for startC in range(0, 4):
-            #for every goal list
-
-            isGoal1 = True #assume this goalList is all 0's
-            isGoal2 = True
-            for goalOffsetC in range(0, 4):
-                goalPosC = startC + goalOffsetC
-                posVal = board[currRow][goalPosC]
-                #if invalid position for a player
-                if (posVal == 1):
-                    isGoal2 = False
-                elif (posVal == 2):
-                    isGoal1 = False
-                else:
-                    isGoal1 = False
-                    isGoal2 = False
-
-                if isGoal1 == False and isGoal2 == False:
-                    break
-            
-            #add the valid goals to the total
-            if isGoal1 == True and player_num == 1:
-                return True
-            if isGoal2 == True and player_num == 2:
-                return True
-    
-    #diagonals (top left to bottom right)
-    for startRow in range(0, 3):
-        for startCol in range(0, 4):
-            #if invalid position for a player mark it as so
-            isGoal1 = True #assume this goalList is all 0's
-            isGoal2 = True
-            #for each top left to down right goal list
-            for tokenNum in range(0, 4):
-                goalPosR = startRow + tokenNum
-                goalPosC = startCol + tokenNum
-                posVal = board[goalPosR][goalPosC]
-                #if invalid position for a player
-                if (posVal == 1):
-                    isGoal2 = False
-                elif (posVal == 2):
-                    isGoal1 = False
-                else:
-                    isGoal1 = False
-                    isGoal2 = False
-                
-                if isGoal1 == False and isGoal2 == False:
-                    break
-            #add the valid goals to the total
-            if isGoal1 == True and player_num == 1:
-                return True
-            if isGoal2 == True and player_num == 2:
-                return True
-
-    #diagonals (bottom left to top right)
-    for startRow in range(0, 3):
-        for startCol in range(0, 4):
-            #if invalid position for a player mark it as so
-            isGoal1 = True #assume this goalList is all 0's
-            isGoal2 = True
-
-            #for each down left to top right goal list
-            oppositeRow = 5 - startRow
-            for tokenNum in range(0, 4):
-                goalPosR = oppositeRow - tokenNum
-                goalPosC = startCol + tokenNum
-                posVal = board[goalPosR][goalPosC]
-                #if invalid position for a player
-                if (posVal == 1):
-                    isGoal2 = False
-                elif (posVal == 2):
-                    isGoal1 = False
-                else:
-                    isGoal1 = False
-                    isGoal2 = False
-                
-                if isGoal1 == False and isGoal2 == False:
-                    break
-            #add the valid goals to the total
-            if isGoal1 == True and player_num == 1:
-                return True
-            if isGoal2 == True and player_num == 2:
-                return True
-            
-
-def copy_board(board):
-    #make new board and execute the move
-    newBoard = [[0] * 7 for _ in range(6)]
-    #create a new board
-    #copy board values
-    for row in range(0, 6):
-        for col in range(0, 7):
-            newBoard[row][col] = board[row][col]
-    
-    return newBoard
-
-
-
-
-
-
-    # player_win_str = '{0}{0}{0}{0}'.format(player_num)
-    # to_str = lambda a: ''.join(a.astype(str))
-
-    # def check_horizontal(b):
-    #     for row in b:
-    #         if player_win_str in to_str(row):
-    #             return True
-    #     return False
-
-    # def check_verticle(b):
-    #     return check_horizontal(b.T)
-
-    # def check_diagonal(b):
-    #     for op in [None, np.fliplr]:
-    #         op_board = op(b) if op else b
-            
-    #         root_diag = np.diagonal(op_board, offset=0).astype(int)
-    #         if player_win_str in to_str(root_diag):
-    #             return True
-
-    #         for i in range(1, b.shape[1]-3):
-    #             for offset in [i, -i]:
-    #                 diag = np.diagonal(op_board, offset=offset)
-    #                 diag = to_str(diag.astype(int))
-    #                 if player_win_str in diag:
-    #                     return True
-
-    #     return False
-
-    # return (check_horizontal(board) or
-    #         check_verticle(board) or
-    #         check_diagonal(board))
-
+#This function splits a command line param string into its leading value and
+#a dict of key=value options, e.g. '6,tt=22' -> ('6', {'tt': '22'})
+def parse_params(param):
+    value = None
+    options = dict()
+    if not param:
+        return value, options
+    for part in param.split(','):
+        part = part.strip()
+        if '=' in part:
+            key, option = part.split('=', 1)
+            options[key.strip()] = option.strip()
+        elif part:
+            value = part
+    return value, options
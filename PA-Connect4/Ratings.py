@@ -0,0 +1,207 @@
+#Elo ratings from game results
+#
+# elo_ratings fits the Bradley-Terry (Elo) model by maximum likelihood: the
+# expected score of a player rated r_a against one rated r_b is
+#   1 / (1 + 10 ** ((r_b - r_a) / 400))
+# and ties count as half a win for each side. As in BayesElo, every pair of
+# players that met also gets PRIOR_DRAWS virtual tied games, which keeps the
+# ratings finite when one player won every game. The ratings are centered on
+# 0, and the confidence intervals come from the curvature of the likelihood
+# at its maximum.
+#
+# SPRT is a sequential probability ratio test for A/B matches, which stops a
+# match as soon as the results are enough to tell two Elo differences apart.
+
+import math
+
+import numpy as np
+
+#Virtual ties added between every pair of players that played each other
+PRIOR_DRAWS = 2
+#Elo points per natural log unit of the odds
+ELO_SCALE = 400 / math.log(10)
+#Newton's method stops when no rating moves by more than this (Elo points)
+TOLERANCE = 1e-6
+MAX_STEPS = 100
+#Bisection steps when fitting the SPRT's outcome probabilities
+MAX_BISECTIONS = 60
+
+
+def elo_ratings(names, results, confidence=0.95):
+    """
+    Computes Elo ratings with confidence intervals
+
+    INPUTS:
+    names - the players' names
+    results - a list of (name a, name b, score of a) with score 1, 0.5 or 0
+    confidence - probability covered by the intervals
+
+    RETURNS:
+    A list of (name, rating, interval half-width, games, score) per player, best first
+    """
+    index = {name: i for i, name in enumerate(names)}
+    size = len(names)
+    #points[i][j] is what i scored against j, games[i][j] how often they played
+    points = np.zeros((size, size))
+    games = np.zeros((size, size))
+    for a, b, score in results:
+        i = index[a]
+        j = index[b]
+        points[i, j] += score
+        points[j, i] += 1 - score
+        games[i, j] += 1
+        games[j, i] += 1
+
+    met = games > 0
+    prior_points = points + met * (PRIOR_DRAWS / 2)
+    prior_games = games + met * PRIOR_DRAWS
+
+    #Newton's method on the log likelihood, ratings in natural log units
+    ratings = np.zeros(size)
+    for _ in range(MAX_STEPS):
+        expected = 1 / (1 + np.exp(ratings[None, :] - ratings[:, None]))
+        gradient = (prior_points - prior_games * expected).sum(axis=1)
+        weights = prior_games * expected * expected.T
+        hessian = weights - np.diag(weights.sum(axis=1))
+        #The ratings are only known up to a constant, so the Hessian is
+        #singular; the pseudo-inverse takes the step that keeps their sum
+        step = -np.linalg.pinv(hessian) @ gradient
+        ratings += step
+        ratings -= ratings.mean()
+        if np.abs(step).max() * ELO_SCALE < TOLERANCE:
+            break
+
+    expected = 1 / (1 + np.exp(ratings[None, :] - ratings[:, None]))
+    weights = prior_games * expected * expected.T
+    covariance = np.linalg.pinv(np.diag(weights.sum(axis=1)) - weights)
+    z = _normal_quantile(0.5 + confidence / 2)
+    margins = z * np.sqrt(np.maximum(np.diag(covariance), 0)) * ELO_SCALE
+
+    table = []
+    for i, name in enumerate(names):
+        played = games[i].sum()
+        score = points[i].sum() / played if played else 0.0
+        table.append((name, ratings[i] * ELO_SCALE, margins[i], int(played), score))
+    table.sort(key=lambda row: -row[1])
+    return table
+
+
+def _normal_quantile(p):
+    #Inverse of the standard normal CDF, by bisection on math.erf
+    low, high = -10.0, 10.0
+    for _ in range(100):
+        middle = (low + high) / 2
+        if 0.5 * (1 + math.erf(middle / math.sqrt(2))) < p:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+
+def print_ratings(table):
+    #Prints the table returned by elo_ratings
+    print('{:>4}  {:<30} {:>8} {:>8} {:>7} {:>7}'.format('rank', 'player', 'elo', '+/-', 'games', 'score'))
+    for rank, (name, rating, margin, played, score) in enumerate(table, 1):
+        print('{:>4}  {:<30} {:>8.1f} {:>8.1f} {:>7} {:>6.1f}%'.format(rank, name, rating, margin, played, 100 * score))
+
+
+def expected_score(elo):
+    #Expected score of a player rated elo points above their opponent
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+class SPRT:
+    """
+    Sequential probability ratio test between two Elo hypotheses for the
+    difference between player A and player B:
+      H0: A is elo0 stronger     H1: A is elo1 stronger (elo1 > elo0)
+
+    Results are added one game at a time. The test is a generalized SPRT on
+    the exact trinomial (win/tie/loss) likelihood: under each hypothesis the
+    win, tie and loss probabilities are the maximum likelihood ones whose
+    expected score is s0 (or s1), the score that Elo difference gives, and
+      LLR = sum over outcomes of count * log(p1 / p0)
+    The test stops when the LLR leaves [log(beta / (1 - alpha)),
+    log((1 - beta) / alpha)], which bounds the chance of accepting H1 when H0
+    holds by about alpha and of accepting H0 when H1 holds by about beta.
+    """
+    def __init__(self, elo0, elo1, alpha=0.05, beta=0.05):
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        self.wins = 0
+        self.ties = 0
+        self.losses = 0
+
+    def add(self, score):
+        #Adds one game, score is A's result (1, 0.5 or 0)
+        if score == 1:
+            self.wins += 1
+        elif score == 0:
+            self.losses += 1
+        else:
+            self.ties += 1
+
+    def llr(self):
+        games = self.wins + self.ties + self.losses
+        if games == 0:
+            return 0.0
+        counts = [(1.0, self.wins), (0.5, self.ties), (0.0, self.losses)]
+        s0 = expected_score(self.elo0)
+        s1 = expected_score(self.elo1)
+        return sum(n * math.log(p1 / p0) for (_, n), p0, p1 in
+                   zip(counts, _constrained_mle(counts, s0), _constrained_mle(counts, s1)) if n > 0)
+
+    def status(self):
+        #'H1' or 'H0' once a hypothesis is accepted, None while the test goes on
+        llr = self.llr()
+        if llr >= self.upper:
+            return 'H1'
+        if llr <= self.lower:
+            return 'H0'
+        return None
+
+    def summary(self):
+        return 'SPRT elo0={} elo1={}: +{} ={} -{}, LLR {:.2f} in [{:.2f}, {:.2f}]'.format(
+            self.elo0, self.elo1, self.wins, self.ties, self.losses, self.llr(), self.lower, self.upper)
+
+
+def _constrained_mle(counts, score):
+    """
+    Maximum likelihood outcome probabilities with a given expected score
+
+    INPUTS:
+    counts - (score of the outcome, times it happened) for each outcome
+    score - the expected score the probabilities must give (0 < score < 1)
+
+    RETURNS:
+    The probability of each outcome, in the order of counts (only those of
+    outcomes that happened are meaningful)
+    """
+    games = sum(n for _, n in counts)
+    observed = [(x - score, n / games) for x, n in counts if n > 0]
+    #With a Lagrange multiplier l the probabilities are f / (1 + l (x - score)),
+    #and l is the root of g(l) = sum f (x - score) / (1 + l (x - score)), which
+    #falls as l grows. l must keep the denominator of every outcome (even one
+    #that never happened) positive; when g has no root in that range, the
+    #maximum is at its edge, where the outcomes that never happened take the
+    #rest of the probability
+    low = max(-1 / (x - score) for x, _ in counts if x > score)
+    high = min(-1 / (x - score) for x, _ in counts if x < score)
+    for _ in range(MAX_BISECTIONS):
+        middle = (low + high) / 2
+        if sum(f * d / (1 + middle * d) for d, f in observed) > 0:
+            low = middle
+        else:
+            high = middle
+    l = (low + high) / 2
+    return [n / games / (1 + l * (x - score)) if n > 0 else 0.0 for x, n in counts]
+
+
+def parse_sprt(sprt):
+    #Turns an --sprt option 'elo0,elo1' or 'elo0,elo1,alpha,beta' into an SPRT
+    values = [float(value) for value in sprt.split(',')]
+    if len(values) not in [2, 4] or values[1] <= values[0]:
+        raise ValueError('--sprt needs elo0,elo1 or elo0,elo1,alpha,beta with elo1 > elo0, got {}'.format(sprt))
+    return SPRT(*values)
@@ -0,0 +1,73 @@
+#Batched random playouts for MCTS
+#
+# batch_rollouts plays n random games from the same position at once. The
+# games are arrays of n bitboards (one uint64 per game and player) plus an
+# (n, 7) array of column heights, and every ply is a handful of numpy
+# operations over all of them: the legal move mask, a random legal column for
+# each game, dropping the pieces and the four in a row check. Games that are
+# over stop changing while the others play on.
+#
+# One batch costs about as much as a few single Python rollouts, so MCTS can
+# back up n results from a leaf for little more than the price of one
+# (leaf parallelization).
+
+import numpy as np
+
+from Bitboard import COLS, H1, ROWS
+
+#Bit index of each column's sentinel cell: a column is full when its height reaches it
+COLUMN_TOPS = np.array([col * H1 + ROWS for col in range(COLS)], dtype=np.uint64)
+#Shifts for the vertical, horizontal and two diagonal directions
+_SHIFTS = [np.uint64(shift) for shift in (1, H1, H1 + 1, H1 - 1)]
+_ONE = np.uint64(1)
+
+
+def alignments(bits):
+    #Vectorized Bitboard.alignment: True for each uint64 bitboard with four in a row
+    found = np.zeros(len(bits), dtype=bool)
+    for shift in _SHIFTS:
+        m = bits & (bits >> shift)
+        found |= (m & (m >> (shift + shift))) != 0
+    return found
+
+
+def batch_rollouts(position, player_num, n, rng):
+    """
+    Plays n random games to the end from position
+
+    INPUTS:
+    position - a Bitboard.Position with player_num to move (not a finished game)
+    player_num - the player to move (1 or 2)
+    n - number of games
+    rng - a numpy random Generator
+
+    RETURNS:
+    A length n int8 array, +1 where player_num won, -1 where they lost and 0 for ties
+    """
+    pieces = [None,
+              np.full(n, position.pieces[1], dtype=np.uint64),
+              np.full(n, position.pieces[2], dtype=np.uint64)]
+    heights = np.tile(np.array(position.heights, dtype=np.uint64), (n, 1))
+    games = np.arange(n)
+    active = np.ones(n, dtype=bool)
+    results = np.zeros(n, dtype=np.int8)
+
+    mover = player_num
+    #Every game still going fills one cell per ply, so they all fill the
+    #board together and any game left after the last ply is a tie
+    for _ in range(ROWS * COLS - position.num_moves):
+        legal = heights < COLUMN_TOPS
+        #The legal column with the largest random key is a uniform random legal move
+        cols = np.argmax(np.where(legal, rng.random((n, COLS)), -1.0), axis=1)
+        index = heights[games, cols]
+        pieces[mover] |= np.where(active, _ONE << index, np.uint64(0))
+        heights[games, cols] += active
+
+        won = active & alignments(pieces[mover])
+        results[won] = 1 if mover == player_num else -1
+        active &= ~won
+        if not active.any():
+            break
+        mover = 3 - mover
+
+    return results
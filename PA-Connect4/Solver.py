@@ -0,0 +1,209 @@
+#Exact endgame solver
+#
+# Solver.best_move plays perfectly: it searches to the end of the game and
+# scores positions as win (1), tie (0) or loss (-1) for the player to move.
+# The search is negamax alpha-beta over a Bitboard.Position with
+#   - an immediate win check at every node, and forced blocks: if the other
+#     player threatens to win in one column that is the only move searched,
+#     and two such threats are a loss
+#   - center first move ordering
+#   - mirror symmetry: a position and its mirror image have the same result,
+#     so both are stored under one key (Position.canonical_hash), and on a
+#     symmetric position only one move of each mirrored pair is searched
+#   - a TranspositionTable, storing each result with its bound type
+#   - a SolverCache: results of positions with at least DISK_MIN_EMPTIES empty
+#     cells are also written to a memory-mapped file, which every game and
+#     process using the same file shares, so an endgame is only solved once
+#
+# A won position stays won as long as a winning move is played, and the game
+# can not go on forever, so always playing a winning move is enough to win.
+
+import mmap
+import os
+import tempfile
+
+from Bitboard import COLS, ROWS, mirror_move
+from MoveOrdering import CENTER_ORDER
+from TranspositionTable import EXACT, LOWER, UPPER, TranspositionTable
+
+WIN = 1
+TIE = 0
+LOSS = -1
+
+#Only positions with at least this many empty cells go in the disk cache
+#(smaller ones are quicker to solve again than to look up)
+DISK_MIN_EMPTIES = 8
+#Default cache file, shared by every game on this machine
+DEFAULT_CACHE_PATH = os.path.join(tempfile.gettempdir(), 'connect4_solver_cache.bin')
+
+
+class SolverCache:
+    """
+    A fixed-size hash table of solved positions in a memory-mapped file.
+
+    Slot i is two 64-bit words, (key ^ data, data), where data is the result
+    + 2 (so 0 marks an empty slot). A lookup only trusts a slot whose words
+    xor back to the key, so a slot torn by two processes writing it at the
+    same time reads as a miss instead of a wrong result.
+    """
+    def __init__(self, path=DEFAULT_CACHE_PATH, size_bits=20):
+        self.path = path
+        self.size = 1 << size_bits
+        self.index_mask = self.size - 1
+        nbytes = 16 * self.size
+
+        with open(path, 'a+b') as f:
+            if os.path.getsize(path) != nbytes:
+                #New (or a different size): start with an empty table
+                f.truncate(0)
+                f.truncate(nbytes)
+            self.mmap = mmap.mmap(f.fileno(), nbytes)
+        self.words = memoryview(self.mmap).cast('Q')
+
+        #Statistics
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, key):
+        #Returns the stored result for the position with this hash, or None
+        self.probes += 1
+        slot = 2 * (key & self.index_mask)
+        data = self.words[slot + 1]
+        if data == 0 or self.words[slot] ^ data != key:
+            return None
+        self.hits += 1
+        return data - 2
+
+    def store(self, key, value):
+        slot = 2 * (key & self.index_mask)
+        data = value + 2
+        self.words[slot] = key ^ data
+        self.words[slot + 1] = data
+
+    def close(self):
+        self.words.release()
+        self.mmap.close()
+
+
+class Solver:
+    def __init__(self, table=None, cache=None):
+        #table - a TranspositionTable (a new one is made if None)
+        #cache - a SolverCache, or None to only use the table
+        self.table = table if table is not None else TranspositionTable(20)
+        self.cache = cache
+        self.nodes = 0
+
+    def best_move(self, position, player_num):
+        """
+        Solves position with player_num to move
+
+        INPUTS:
+        position - a Bitboard.Position that is not a finished game (it is not modified)
+        player_num - the player to move (1 or 2)
+
+        RETURNS:
+        (result for player_num: WIN, TIE or LOSS, a move that achieves it)
+        """
+        position = position.copy()
+        self.nodes = 0
+        moves = [col for col in CENTER_ORDER if position.can_play(col)]
+        for col in moves:
+            if position.is_winning_move(col, player_num):
+                return WIN, col
+        if position.is_symmetric():
+            moves = [col for col in moves if col <= (COLS - 1) // 2]
+
+        best_value = LOSS - 1
+        best_move = moves[0]
+        for col in moves:
+            position.make_move(col, player_num)
+            if position.is_full():
+                value = TIE
+            else:
+                value = -self.negamax(position, 3 - player_num, LOSS, -best_value if best_value >= LOSS else WIN)
+            position.unmake_move()
+            if value > best_value:
+                best_value = value
+                best_move = col
+                if value == WIN:
+                    break
+
+        empties = ROWS * COLS - position.num_moves
+        key, mirrored = position.canonical_hash()
+        self.table.store(key, best_value, empties, EXACT, mirror_move(best_move) if mirrored else best_move)
+        if self.cache is not None and empties >= DISK_MIN_EMPTIES:
+            self.cache.store(key, best_value)
+        return best_value, best_move
+
+    def negamax(self, position, player_num, alpha, beta):
+        #Returns the result of position (not a finished game) for player_num,
+        #fail-soft within (alpha, beta)
+        self.nodes += 1
+        other_player = 3 - player_num
+
+        moves = [col for col in CENTER_ORDER if position.can_play(col)]
+        for col in moves:
+            if position.is_winning_move(col, player_num):
+                return WIN
+        #No win, and our move fills the last cell
+        if position.num_moves == ROWS * COLS - 1:
+            return TIE
+
+        #The other player's immediate threats must be blocked
+        threats = [col for col in moves if position.is_winning_move(col, other_player)]
+        if len(threats) > 1:
+            return LOSS
+        if threats:
+            moves = threats
+        elif position.is_symmetric():
+            moves = [col for col in moves if col <= (COLS - 1) // 2]
+
+        key, _ = position.canonical_hash()
+        table = self.table
+        entry = table.probe(key)
+        if entry is not None:
+            value, _, flag, _ = entry
+            value = int(value)
+            if flag == EXACT:
+                return value
+            if flag == LOWER and value > alpha:
+                alpha = value
+            elif flag == UPPER and value < beta:
+                beta = value
+            if alpha >= beta:
+                return value
+
+        empties = ROWS * COLS - position.num_moves
+        cache = self.cache
+        if cache is not None and empties >= DISK_MIN_EMPTIES:
+            value = cache.probe(key)
+            if value is not None:
+                table.store(key, value, empties, EXACT)
+                return value
+
+        original_alpha = alpha
+        best_value = LOSS - 1
+        for col in moves:
+            position.make_move(col, player_num)
+            value = -self.negamax(position, other_player, -beta, -alpha)
+            position.unmake_move()
+            if value > best_value:
+                best_value = value
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        break
+
+        if best_value == WIN or best_value == LOSS:
+            #A bound at the end of the scale is the exact result
+            flag = EXACT
+        elif best_value <= original_alpha:
+            flag = UPPER
+        elif best_value >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        table.store(key, best_value, empties, flag)
+        if flag == EXACT and cache is not None and empties >= DISK_MIN_EMPTIES:
+            cache.store(key, best_value)
+        return best_value
@@ -0,0 +1,73 @@
+#Fixed-size transposition table for the depth-limited searches
+#
+# Entries are kept in flat typed arrays (one slot per index), so the memory used
+# is fixed when the table is created: 19 bytes per slot, about 20MB for the
+# default 2**20 slots. A slot is picked by the low bits of the position's Zobrist
+# hash and the full 64-bit hash is stored to detect collisions.
+
+from array import array
+
+#Bound types
+EXACT = 0 #value is the exact minimax value
+LOWER = 1 #search failed high, the real value is >= value
+UPPER = 2 #search failed low, the real value is <= value
+
+#Replacement policies
+# 'always' - a new entry always overwrites the slot
+# 'depth'  - a new entry only overwrites an empty slot or an entry that was
+#            searched to the same or a smaller depth
+REPLACEMENT_POLICIES = ['always', 'depth']
+
+NO_MOVE = -1
+
+
+class TranspositionTable:
+    def __init__(self, size_bits=20, policy='depth'):
+        if policy not in REPLACEMENT_POLICIES:
+            raise ValueError('Unknown replacement policy {}, choose from {}'.format(policy, REPLACEMENT_POLICIES))
+        self.size = 1 << size_bits
+        self.index_mask = self.size - 1
+        self.policy = policy
+
+        self.keys = array('Q', bytes(8 * self.size))
+        self.values = array('d', bytes(8 * self.size))
+        self.depths = array('b', [-1]) * self.size #-1 marks an empty slot
+        self.flags = array('b', bytes(self.size))
+        self.moves = array('b', [NO_MOVE]) * self.size
+
+        #Statistics
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def probe(self, key):
+        #Returns (value, depth, flag, move) for the position with this hash, or None
+        self.probes += 1
+        index = key & self.index_mask
+        if self.depths[index] < 0 or self.keys[index] != key:
+            return None
+        self.hits += 1
+        return self.values[index], self.depths[index], self.flags[index], self.moves[index]
+
+    def store(self, key, value, depth, flag, move=NO_MOVE):
+        index = key & self.index_mask
+        if self.policy == 'depth' and self.depths[index] > depth:
+            #Keep the deeper result
+            return
+        self.stores += 1
+        self.keys[index] = key
+        self.values[index] = value
+        self.depths[index] = depth
+        self.flags[index] = flag
+        self.moves[index] = NO_MOVE if move is None else move
+
+    def clear(self):
+        self.depths = array('b', [-1]) * self.size
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def hit_rate(self):
+        if self.probes == 0:
+            return 0.0
+        return self.hits / self.probes
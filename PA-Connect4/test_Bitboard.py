@@ -0,0 +1,54 @@
+#Checks the bitboard win checks against a scan of the whole board
+#
+#   python -m pytest -q
+
+import random
+
+from Bitboard import COLS, ROWS, Position
+
+
+def scan_for_win(board, player_num):
+    #Four in a row for player_num anywhere on a 6x7 list of lists, cell by cell
+    for row in range(ROWS):
+        for col in range(COLS):
+            for d_row, d_col in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+                cells = [(row + i * d_row, col + i * d_col) for i in range(4)]
+                if all(0 <= r < ROWS and 0 <= c < COLS and board[r][c] == player_num for r, c in cells):
+                    return True
+    return False
+
+
+def test_last_move_wins_matches_full_scan():
+    rng = random.Random(7)
+    for _ in range(100):
+        position = Position()
+        player_num = 1
+        while not position.is_full():
+            position.make_move(rng.choice(position.get_valid_moves()), player_num)
+            board = position.to_board()
+            won = scan_for_win(board, player_num)
+            assert position.last_move_wins() == won
+            assert position.is_winning(player_num) == won
+            assert not position.is_winning(3 - player_num)
+            if won:
+                break
+            player_num = 3 - player_num
+
+
+def test_is_winning_move_matches_full_scan():
+    #Checking a move without making it agrees with making it and scanning
+    rng = random.Random(9)
+    for _ in range(30):
+        position = Position()
+        player_num = 1
+        while not position.is_full():
+            for col in position.get_valid_moves():
+                position.make_move(col, player_num)
+                won = scan_for_win(position.to_board(), player_num)
+                position.unmake_move()
+                assert position.is_winning_move(col, player_num) == won
+            col = rng.choice(position.get_valid_moves())
+            if position.is_winning_move(col, player_num):
+                break
+            position.make_move(col, player_num)
+            player_num = 3 - player_num
@@ -0,0 +1,93 @@
+#Checks the opening book's file format, lookups and generated moves
+#
+#   python -m pytest -q
+
+import random
+
+import numpy as np
+import pytest
+
+from Bitboard import Position, mirror_move
+from Book import MAGIC, OpeningBook, book_positions, generate, write_book
+from Player import AIPlayer
+from test_Player import is_best_move
+from test_Solver import random_position
+
+
+def mirrored(position):
+    #The mirror image of position
+    return Position.from_board(np.array(position.to_board())[:, ::-1])
+
+
+def test_lookup_finds_the_written_moves(tmp_path):
+    rng = random.Random(32)
+    positions = [random_position(rng, rng.randrange(0, 20))[0] for _ in range(40)]
+    entries = dict()
+    for position in positions:
+        key, is_mirrored = position.canonical_key()
+        move = rng.choice(position.get_valid_moves())
+        entries[key] = mirror_move(move) if is_mirrored else move
+    path = str(tmp_path / 'book.bin')
+    write_book(path, entries.items())
+
+    book = OpeningBook(path)
+    assert len(book) == len(entries)
+    for position in positions:
+        move = book.lookup(position)
+        key, is_mirrored = position.canonical_key()
+        assert move == (mirror_move(entries[key]) if is_mirrored else entries[key])
+        #the mirror image plays the mirrored move
+        if not position.is_symmetric():
+            assert book.lookup(mirrored(position)) == mirror_move(move)
+    missing = Position()
+    for col in [0, 0, 0, 1, 1, 1]:
+        missing.make_move(col, 1 + missing.num_moves % 2)
+    assert missing.canonical_key()[0] not in entries
+    assert book.lookup(missing) is None
+    book.close()
+
+
+def test_generated_moves_are_best_moves(tmp_path):
+    path = str(tmp_path / 'book.bin')
+    generate(path, 3, 3)
+    book = OpeningBook(path)
+    positions = book_positions(3)
+    assert len(book) == len(positions)
+    for pieces1, pieces2 in positions:
+        for position in [Position.from_pieces(pieces1, pieces2), mirrored(Position.from_pieces(pieces1, pieces2))]:
+            player_num = 1 if position.num_moves % 2 == 0 else 2
+            move = book.lookup(position)
+            assert move in position.get_valid_moves()
+            assert is_best_move(position, player_num, move, 3)
+    book.close()
+
+
+def test_bad_books_are_rejected(tmp_path):
+    path = tmp_path / 'book.bin'
+    path.write_bytes(b'not a book at all')
+    with pytest.raises(ValueError):
+        OpeningBook(str(path))
+    #a record cut short
+    path.write_bytes(MAGIC + bytes(12))
+    with pytest.raises(ValueError):
+        OpeningBook(str(path))
+    #the players check their book when they are made, not at their first move
+    with pytest.raises(ValueError):
+        AIPlayer(1, 'ab', 'ab', '2,book={}'.format(path))
+    with pytest.raises(ValueError):
+        AIPlayer(1, 'ab', 'ab', '2,book={}'.format(tmp_path / 'missing.bin'))
+
+
+def test_player_plays_the_book_move(tmp_path):
+    #A book move is played without searching, even one the search would not pick
+    position = Position()
+    position.make_move(3, 1)
+    path = str(tmp_path / 'book.bin')
+    write_book(path, [(position.canonical_key()[0], 0)])
+    board = np.array(position.to_board(), dtype=np.uint8)
+    for ptype, params in [('ab', '2'), ('nm', '2'), ('expmax', '2'), ('mcts', '50')]:
+        player = AIPlayer(2, ptype, ptype, '{},book={}'.format(params, path))
+        get_move = {'ab': player.get_alpha_beta_move, 'nm': player.get_negamax_move,
+                    'expmax': player.get_expectimax_move, 'mcts': player.get_mcts_move}[ptype]
+        assert get_move(board) == 0
+        player.close()
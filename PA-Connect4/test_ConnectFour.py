@@ -0,0 +1,77 @@
+#Checks the game referee's board, win and tie checks, and the AI worker
+#processes that a tournament keeps between its games
+#
+#   python -m pytest -q
+
+import random
+
+import numpy as np
+import pytest
+
+from ConnectFour import AIWorker, Game
+from Player import AIPlayer, RandomPlayer
+from test_Bitboard import scan_for_win
+
+
+def random_players():
+    players = [RandomPlayer(1), RandomPlayer(2)]
+    for player in players:
+        player.name = 'random{}'.format(player.player_number)
+    return players
+
+
+def test_referee_ends_the_game_at_the_first_win():
+    np.random.seed(33)
+    random.seed(33)
+    results = set()
+    for _ in range(60):
+        game = Game(*random_players(), 1, False)
+        board = game.board.tolist()
+        assert game.game_over
+        assert board == game.position.to_board()
+        wins = [scan_for_win(board, player_num) for player_num in [1, 2]]
+        if game.winner is None:
+            assert game.position.is_full() and not any(wins)
+            results.add(0)
+        else:
+            winner = int(game.winner[-1])
+            assert wins[winner - 1] and not wins[2 - winner]
+            assert game.last_player == winner
+            #the game was not won a move earlier
+            game.position.unmake_move()
+            before = game.position.to_board()
+            assert not scan_for_win(before, 1) and not scan_for_win(before, 2)
+            results.add(winner)
+    assert results >= {1, 2}
+
+
+def test_referee_rejects_invalid_moves():
+    game = Game(*random_players(), 1, False)
+    #a fresh board for the same referee
+    game.board[:] = 0
+    game.position.__init__()
+    for _ in range(6):
+        game.update_board(3, 1)
+    assert game.board[:, 3].tolist() == [1] * 6
+    for move in [3, -1, 7]:
+        with pytest.raises(Exception):
+            game.update_board(move, 2)
+
+
+def test_tournament_workers_outlive_their_games():
+    #A worker passed in by a tournament plays each of its games, and is only
+    #closed by the tournament
+    random.seed(34)
+    np.random.seed(34)
+    worker = AIWorker()
+    try:
+        pids = []
+        for _ in range(2):
+            game = Game(AIPlayer(1, 'ab', 'ab', '1'), RandomPlayer(2), 5, False, workers=[worker, None])
+            assert game.game_over
+            assert worker.process.is_alive()
+            pids.append(worker.process.pid)
+        assert pids[0] == pids[1]
+    finally:
+        worker.close()
+    assert not worker.process.is_alive()
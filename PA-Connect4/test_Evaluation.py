@@ -0,0 +1,76 @@
+#Checks that every version of the evaluation gives the same scores
+#
+#   python -m pytest -q
+
+import random
+
+import numpy as np
+
+from Bitboard import Position
+from Evaluation import (IncrementalEvaluator, WIN_SCORE, evaluate_bitboards, evaluate_board, evaluate_bits,
+                        evaluate_boards, parse_weights)
+from test_Solver import random_position
+
+WEIGHTS = [parse_weights(None), parse_weights('1/2/3/4'), parse_weights('0/1/4/9')]
+
+
+def random_positions(seed, count):
+    rng = random.Random(seed)
+    return [random_position(rng, rng.randrange(0, 40))[0] for _ in range(count)]
+
+
+def test_batch_evaluation_matches_one_board_at_a_time():
+    positions = random_positions(18, 60)
+    #finished games too, which score as a win
+    rng = random.Random(18)
+    for position in positions[:10]:
+        won = position.copy()
+        player_num = 1 + won.num_moves % 2
+        while not won.last_move_wins() and not won.is_full():
+            won.make_move(rng.choice(won.get_valid_moves()), player_num)
+            player_num = 3 - player_num
+        positions.append(won)
+
+    boards = np.array([position.to_board() for position in positions], dtype=np.uint8)
+    for weights in WEIGHTS:
+        expected = [evaluate_board(board, weights) for board in boards]
+        assert evaluate_boards(boards, weights).tolist() == expected
+        pieces1 = [position.pieces[1] for position in positions]
+        pieces2 = [position.pieces[2] for position in positions]
+        assert evaluate_bitboards(pieces1, pieces2, weights).tolist() == expected
+
+
+def test_bitboard_evaluation_matches_the_numpy_board():
+    for position in random_positions(19, 60):
+        board = np.array(position.to_board(), dtype=np.uint8)
+        for weights in WEIGHTS:
+            score = evaluate_board(board, weights)
+            assert abs(score) < WIN_SCORE
+            assert evaluate_bits(position.pieces[1], position.pieces[2], weights) == score
+
+
+def test_incremental_evaluation_follows_make_and_unmake():
+    #Played forward through random games and then taken back move by move,
+    #the running score is always evaluate_bits of the current position
+    rng = random.Random(20)
+    for weights in WEIGHTS:
+        evaluator = IncrementalEvaluator(weights)
+        for game in range(20):
+            #half of the games start tracking part way through
+            position, player_num = random_position(rng, 0 if game % 2 else rng.randrange(1, 20))
+            evaluator.reset(position)
+            assert evaluator.score == evaluate_bits(position.pieces[1], position.pieces[2], weights)
+            made = 0
+            while not position.is_full():
+                col = rng.choice(position.get_valid_moves())
+                if position.is_winning_move(col, player_num):
+                    break
+                evaluator.make_move(position.heights[col], player_num)
+                position.make_move(col, player_num)
+                made += 1
+                assert evaluator.score == evaluate_bits(position.pieces[1], position.pieces[2], weights)
+                player_num = 3 - player_num
+            for _ in range(made):
+                evaluator.unmake_move()
+                position.unmake_move()
+                assert evaluator.score == evaluate_bits(position.pieces[1], position.pieces[2], weights)
@@ -0,0 +1,198 @@
+#Checks the array MCTS tree's budgets, reusing it between moves, and how
+#the tree-parallel search collects its workers' results
+#
+#   python -m pytest -q
+
+import logging
+import multiprocessing as mp
+import os
+import random
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from Bitboard import Position
+from MCTS import ITERATIONS_PER_TIME_CHECK, MCTSTree, _collect_results, played_moves
+from Player import AIPlayer
+from test_Solver import random_position
+
+
+def test_run_honors_the_iteration_limit():
+    random.seed(21)
+    tree = MCTSTree(Position(), 1)
+    assert tree.run(iterations=300) == 300
+    assert tree.visits[0] == 300
+    assert sum(n for _, n, _ in tree.root_children()) == 300
+    #a second run carries on growing the same tree
+    assert tree.run(iterations=50) == 50
+    assert tree.visits[0] == 350
+
+
+def test_run_stops_at_the_deadline():
+    random.seed(22)
+    tree = MCTSTree(Position(), 1)
+    start_time = time.perf_counter()
+    done = tree.run(deadline=start_time + 0.1)
+    assert done > 0
+    assert time.perf_counter() - start_time < 0.5
+    #the iteration limit still caps a timed search
+    assert MCTSTree(Position(), 1).run(iterations=10, deadline=time.perf_counter() + 10) == 10
+
+
+def test_run_stops_when_asked():
+    random.seed(23)
+    stop_event = threading.Event()
+    stop_event.set()
+    tree = MCTSTree(Position(), 1)
+    assert tree.run(iterations=1000, stop_event=stop_event) == ITERATIONS_PER_TIME_CHECK
+
+
+def test_run_needs_a_budget():
+    with pytest.raises(ValueError):
+        MCTSTree(Position(), 1).run()
+
+
+def test_player_runs_the_iterations_it_is_given(caplog):
+    #The MCTS param is the number of iterations, for both kinds of tree
+    caplog.set_level(logging.DEBUG, logger='connect4')
+    random.seed(24)
+    for params in ['150', '150,tree=nodes']:
+        caplog.clear()
+        AIPlayer(1, 'mcts', 'mcts', params).get_mcts_move(np.zeros((6, 7), dtype=np.uint8))
+        assert any(record.getMessage().startswith('MCTS iterations: 150,') for record in caplog.records)
+
+
+def subtree_stats(tree, node, depth):
+    #(move, visits, wins, status) of node's descendants, depth levels down
+    first = tree.first_child[node]
+    if depth == 0 or first < 0:
+        return []
+    return [(tree.moves[child], tree.visits[child], tree.wins[child], tree.status[child],
+             subtree_stats(tree, child, depth - 1))
+            for child in range(first, first + tree.num_children[node])]
+
+
+def test_played_moves_replays_to_the_later_position():
+    rng = random.Random(28)
+    for _ in range(30):
+        root, player_num = random_position(rng, rng.randrange(0, 15))
+        later = root.copy()
+        mover = player_num
+        for _ in range(rng.randrange(0, 6)):
+            col = rng.choice(later.get_valid_moves())
+            if later.is_winning_move(col, mover):
+                break
+            later.make_move(col, mover)
+            mover = 3 - mover
+        moves = played_moves(root, later, player_num)
+        replay = root.copy()
+        mover = player_num
+        for col in moves:
+            replay.make_move(col, mover)
+            mover = 3 - mover
+        assert replay.pieces == later.pieces
+
+        #positions that do not follow from root
+        assert played_moves(later, root, player_num) in (None, [])
+        if len(moves) % 2:
+            #one more piece of player_num's, so the other player can not have started
+            assert played_moves(root, later, 3 - player_num) is None
+
+
+def test_advance_keeps_the_statistics_below_the_moves():
+    random.seed(29)
+    tree = MCTSTree(Position(), 1)
+    tree.run(iterations=2000)
+    first = tree.first_child[0]
+    child = max(range(first, first + tree.num_children[0]), key=lambda node: tree.visits[node])
+    grandchild = tree.first_child[child]
+    moves = [tree.moves[child], tree.moves[grandchild]]
+
+    advanced = tree.advance(moves)
+    position = Position()
+    position.make_move(moves[0], 1)
+    position.make_move(moves[1], 2)
+    assert advanced.position.pieces == position.pieces
+    assert advanced.player_number == 1
+    assert advanced.visits[0] == tree.visits[grandchild]
+    assert advanced.wins[0] == tree.wins[grandchild]
+    assert subtree_stats(advanced, 0, 3) == subtree_stats(tree, grandchild, 3)
+    #the advanced tree is searched on from where it was
+    advanced.run(iterations=100)
+    assert advanced.visits[0] == tree.visits[grandchild] + 100
+
+    #moves the tree never tried give nothing to reuse
+    empty = MCTSTree(Position(), 1)
+    assert empty.advance([3]) is None
+
+
+def test_save_and_load_give_back_the_tree(tmp_path):
+    random.seed(30)
+    root, player_num = random_position(random.Random(30), 6)
+    tree = MCTSTree(root, player_num)
+    tree.run(iterations=500)
+    path = str(tmp_path / 'tree.bin')
+    tree.save(path)
+    loaded = MCTSTree.load(path)
+    assert loaded.position.pieces == root.pieces
+    assert loaded.player_number == player_num
+    assert loaded.size == tree.size
+    assert subtree_stats(loaded, 0, 42) == subtree_stats(tree, 0, 42)
+    loaded.run(iterations=10)
+    assert loaded.visits[0] == 510
+
+
+def test_player_reuses_its_tree(caplog, tmp_path):
+    #reuse=1 keeps the tree between a player's moves: in memory in the game's
+    #worker (which sets a stop event), otherwise in a file removed by close()
+    caplog.set_level(logging.DEBUG, logger='connect4')
+    random.seed(31)
+    for stop_event in [threading.Event(), None]:
+        caplog.clear()
+        player = AIPlayer(1, 'mcts', 'mcts', '300,reuse=1')
+        player.stop_event = stop_event
+        board = np.zeros((6, 7), dtype=np.uint8)
+        move = player.get_mcts_move(board)
+        board[5][move] = 1
+        board[5][(move + 1) % 7] = 2
+        if stop_event is None:
+            player.mcts_saved_tree = None
+        player.get_mcts_move(board)
+        assert any(record.getMessage().startswith('Reused tree:') for record in caplog.records)
+        player.close()
+        assert not os.path.exists(player.mcts_tree_file)
+
+
+def report(results, iterations):
+    results.put(iterations)
+
+
+def hang(results):
+    time.sleep(60)
+
+
+def test_collect_results_gives_up_on_missing_workers():
+    results = mp.Queue()
+    processes = [mp.Process(target=report, args=(results, 10)) for _ in range(2)]
+    for p in processes:
+        p.start()
+    assert _collect_results(results, processes, time.perf_counter() + 5) == 20
+    for p in processes:
+        p.join()
+
+    #a worker that exits without reporting
+    processes = [mp.Process(target=report, args=(results, 10)), mp.Process(target=os._exit, args=(1,))]
+    for p in processes:
+        p.start()
+    assert _collect_results(results, processes, None) is None
+
+    #a worker still running well after the deadline is stopped
+    processes = [mp.Process(target=report, args=(results, 10)), mp.Process(target=hang, args=(results,))]
+    for p in processes:
+        p.start()
+    start_time = time.perf_counter()
+    assert _collect_results(results, processes, start_time) is None
+    assert time.perf_counter() - start_time < 5
+    assert not any(p.is_alive() for p in processes)
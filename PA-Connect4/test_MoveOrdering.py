@@ -0,0 +1,72 @@
+#Checks each move ordering heuristic, and that ordering changes how fast the
+#alpha-beta search is but never its result
+#
+#   python -m pytest -q
+
+import random
+
+import pytest
+
+from MoveOrdering import CENTER_ORDER, HEURISTICS, MoveOrderer, parse_ordering
+from Player import AIPlayer
+from test_Player import alpha_beta_value, minimax
+from test_Solver import random_position
+
+
+def test_center_order():
+    assert MoveOrderer({'center'}).order(list(range(7)), 0, 1) == CENTER_ORDER
+    assert MoveOrderer({'center'}).order([0, 2, 6], 0, 1) == [2, 0, 6]
+    assert MoveOrderer(set()).order([0, 2, 6], 0, 1) == [0, 2, 6]
+
+
+def test_hash_move_goes_first():
+    orderer = MoveOrderer(parse_ordering('all'))
+    orderer.record_cutoff(5, 2, 1, 3)
+    assert orderer.order(list(range(7)), 2, 1, hash_move=6)[:2] == [6, 5]
+    #a hash move that can not be played is left out
+    assert 1 not in orderer.order([0, 2, 3], 2, 1, hash_move=1)
+
+
+def test_killers_are_kept_per_ply():
+    orderer = MoveOrderer({'center', 'killer'})
+    orderer.record_cutoff(0, 4, 1, 2)
+    orderer.record_cutoff(6, 4, 1, 2)
+    orderer.record_cutoff(5, 4, 1, 2)
+    #the two most recent killers, most recent first
+    assert orderer.order(list(range(7)), 4, 1)[:3] == [5, 6, 3]
+    assert orderer.order(list(range(7)), 3, 1) == CENTER_ORDER
+    orderer.new_search()
+    assert orderer.order(list(range(7)), 4, 1) == CENTER_ORDER
+
+
+def test_history_scores_by_player_and_depth():
+    orderer = MoveOrderer({'center', 'history'})
+    orderer.record_cutoff(0, 1, 1, 2)
+    orderer.record_cutoff(6, 5, 1, 3)
+    assert orderer.order(list(range(7)), 0, 1)[:3] == [6, 0, 3]
+    assert orderer.order(list(range(7)), 0, 2) == CENTER_ORDER
+    #older results count for less
+    orderer.new_search()
+    assert orderer.history_scores[1][6] == 4 and orderer.history_scores[1][0] == 2
+
+
+def test_unknown_heuristic_is_rejected():
+    assert parse_ordering('none') == set()
+    assert parse_ordering('center+killer') == {'center', 'killer'}
+    with pytest.raises(ValueError):
+        parse_ordering('center+newest')
+
+
+def test_ordering_does_not_change_the_search_result():
+    rng = random.Random(16)
+    orders = ['none', 'all'] + HEURISTICS
+    for _ in range(6):
+        position, player_num = random_position(rng, rng.randrange(0, 20))
+        real = minimax(position, player_num, 4)
+        nodes = dict()
+        for order in orders:
+            player = AIPlayer(player_num, 'ab', 'ab', '4,order=' + order)
+            assert alpha_beta_value(player, position, player_num)[1] == real
+            nodes[order] = player.stats.nodes
+        #on these positions, all of the heuristics together search fewer nodes than none
+        assert nodes['all'] <= nodes['none']
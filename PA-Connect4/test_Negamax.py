@@ -0,0 +1,80 @@
+#Checks the negamax search against a plain minimax search of the same depth
+#
+#   python -m pytest -q
+
+import random
+
+from Evaluation import evaluate_bits
+from MoveOrdering import MoveOrderer, parse_ordering
+from Negamax import NegamaxSearch
+from TranspositionTable import EXACT, LOWER, UPPER, TranspositionTable
+from test_Player import minimax
+from test_Solver import random_position
+
+
+def evaluate(position):
+    return evaluate_bits(position.pieces[1], position.pieces[2])
+
+
+def side_to_move(value, player_num):
+    #A value from player 1's point of view, from player_num's
+    return value if player_num == 1 else -value
+
+
+def check_table_entries(table, position, player_num, plies):
+    #Every table entry for a position up to plies moves below position holds
+    #the minimax score (EXACT) or a correct bound on it (LOWER / UPPER) for the
+    #player to move there, for the depth the entry was searched to
+    for col in position.get_valid_moves():
+        position.make_move(col, player_num)
+        if not position.last_move_wins() and not position.is_full():
+            entry = table.probe(position.hash)
+            if entry is not None:
+                value, depth, flag, _ = entry
+                real = side_to_move(minimax(position, 3 - player_num, depth), 3 - player_num)
+                assert {EXACT: real == value, LOWER: real >= value, UPPER: real <= value}[flag]
+            if plies > 1:
+                check_table_entries(table, position, 3 - player_num, plies - 1)
+        position.unmake_move()
+
+
+def check_search(search, position, player_num, depth):
+    #The search's score is the minimax score, its move gets that score, and
+    #every entry in its table is correct
+    move, score, _ = search.search(position, player_num, depth)
+    real = side_to_move(minimax(position, player_num, depth), player_num)
+    assert score == real
+
+    position.make_move(move, player_num)
+    if position.last_move_wins():
+        assert real == 300
+    elif not position.is_full():
+        assert side_to_move(minimax(position, 3 - player_num, depth - 1), player_num) == real
+    position.unmake_move()
+
+    if search.table is not None:
+        check_table_entries(search.table, position, player_num, depth - 1)
+    return move
+
+
+def test_negamax_matches_minimax():
+    rng = random.Random(20)
+    settings = [dict(table=None, pvs=False, aspiration_window=0),
+                dict(table=None, pvs=True, aspiration_window=0),
+                dict(table=None, pvs=True, aspiration_window=1),
+                dict(table=TranspositionTable(16), pvs=True, aspiration_window=10),
+                dict(table=TranspositionTable(4, 'always'), pvs=True, aspiration_window=10)]
+    for options in settings:
+        #One search plays several moves of a game against random moves,
+        #keeping its table and move ordering from move to move
+        search = NegamaxSearch(evaluate, orderer=MoveOrderer(parse_ordering('all')), **options)
+        for _ in range(2):
+            position, player_num = random_position(rng, rng.randrange(0, 12))
+            for _ in range(6):
+                move = check_search(search, position, player_num, 4)
+                position.make_move(move, player_num)
+                if position.last_move_wins() or position.is_full():
+                    break
+                position.make_move(rng.choice(position.get_valid_moves()), 3 - player_num)
+                if position.last_move_wins() or position.is_full():
+                    break
@@ -0,0 +1,131 @@
+#Checks the AIPlayer searches against a plain minimax search of the same depth
+#
+#   python -m pytest -q
+
+import random
+import time
+
+import numpy as np
+
+from Bitboard import Position
+from Evaluation import evaluate_bits
+from MoveOrdering import SearchStats
+from Player import AIPlayer
+from TranspositionTable import EXACT, LOWER, UPPER
+from test_Solver import random_position
+
+
+def minimax(position, player_num, depth):
+    #Value of position with player_num to move, from player 1's point of view,
+    #searching every move to depth plies and scoring the leaves like the searches
+    if position.last_move_wins():
+        return -300 if player_num == 1 else 300
+    if position.is_full():
+        return 0
+    if depth == 0:
+        return evaluate_bits(position.pieces[1], position.pieces[2])
+    values = []
+    for col in position.get_valid_moves():
+        position.make_move(col, player_num)
+        values.append(minimax(position, 3 - player_num, depth - 1))
+        position.unmake_move()
+    return max(values) if player_num == 1 else min(values)
+
+
+def is_best_move(position, player_num, move, depth):
+    #True if move gets the minimax value of position (searched depth plies)
+    values = dict()
+    for col in position.get_valid_moves():
+        position.make_move(col, player_num)
+        values[col] = minimax(position, 3 - player_num, depth - 1)
+        position.unmake_move()
+    best = max(values.values()) if player_num == 1 else min(values.values())
+    return values[move] == best
+
+
+def alpha_beta_value(player, position, player_num):
+    #Runs player's alpha-beta search from position the way get_alpha_beta_move
+    #does, and returns (best move, value)
+    player.player_number = player_num
+    player.other_player_number = 3 - player_num
+    player.get_transposition_table()
+    player.stats = SearchStats()
+    player.move_orderer.new_search()
+    moves = player.move_orderer.order(position.get_valid_moves(), 0, player_num)
+    return player.get_alpha_beta_root_move(position, moves, moves[0])
+
+
+def check_table_entries(table, position, player_num, plies):
+    #Every table entry for a position up to plies moves below position holds
+    #the minimax value (EXACT) or a correct bound on it (LOWER / UPPER), from
+    #the point of view of player 1, for the depth the entry was searched to
+    for col in position.get_valid_moves():
+        position.make_move(col, player_num)
+        if not position.last_move_wins() and not position.is_full():
+            entry = table.probe(position.hash)
+            if entry is not None:
+                value, depth, flag, _ = entry
+                real = minimax(position, 3 - player_num, depth)
+                assert {EXACT: real == value, LOWER: real >= value, UPPER: real <= value}[flag]
+            if plies > 1:
+                check_table_entries(table, position, 3 - player_num, plies - 1)
+        position.unmake_move()
+
+
+def play_against_random(player, rng, depth, moves=8):
+    #Plays player against random moves from a random opening, checking that
+    #every search gives the minimax value and a move that gets it. The player
+    #keeps its transposition table from move to move, as in a game
+    position, player_num = random_position(rng, rng.randrange(0, 12))
+    for _ in range(moves):
+        move, value = alpha_beta_value(player, position, player_num)
+        assert value == minimax(position, player_num, depth)
+        assert is_best_move(position, player_num, move, depth)
+        if player.transposition_table is not None:
+            check_table_entries(player.transposition_table, position, player_num, depth - 1)
+        for col, mover in [(move, player_num), (None, 3 - player_num)]:
+            if col is None:
+                col = rng.choice(position.get_valid_moves())
+            position.make_move(col, mover)
+            if position.last_move_wins() or position.is_full():
+                return
+
+
+def test_alpha_beta_matches_minimax():
+    rng = random.Random(14)
+    for params in ['4,tt=0', '4', '4,tt=4,replace=always', '4,tt=4,replace=depth', '4,batch=1',
+                   '4,incremental=1']:
+        player = AIPlayer(1, 'ab', 'ab', params)
+        for _ in range(2):
+            play_against_random(player, rng, 4)
+
+
+def test_get_alpha_beta_move_plays_a_best_move():
+    rng = random.Random(12)
+    np.random.seed(12)
+    for _ in range(5):
+        position, player_num = random_position(rng, rng.randrange(0, 20))
+        player = AIPlayer(player_num, 'ab', 'ab', '4')
+        move = player.get_alpha_beta_move(np.array(position.to_board()))
+        assert is_best_move(position, player_num, move, 4)
+
+
+def test_iterative_deepening_plays_a_best_move_of_the_depth_cap():
+    #With time to spare every depth up to the cap finishes
+    rng = random.Random(15)
+    np.random.seed(15)
+    for _ in range(4):
+        position, player_num = random_position(rng, rng.randrange(0, 20))
+        player = AIPlayer(player_num, 'ab', 'ab', '4,id=1,budget=60')
+        move = player.get_alpha_beta_move(np.array(position.to_board()))
+        assert is_best_move(position, player_num, move, 4)
+        #the fixed depth and the deadline are put back afterwards
+        assert player.depth_limit == 4 and player.deadline is None
+
+
+def test_iterative_deepening_stops_at_the_time_budget():
+    player = AIPlayer(1, 'ab', 'ab', 'id=1,budget=0.05')
+    start_time = time.perf_counter()
+    move = player.get_alpha_beta_move(np.zeros((6, 7), dtype=np.uint8))
+    assert time.perf_counter() - start_time < 0.5
+    assert move in range(7)
@@ -0,0 +1,72 @@
+#Checks the Elo fit and the SPRT with results whose answer is known
+#
+#   python -m pytest -q
+
+import math
+import random
+
+from Ratings import ELO_SCALE, PRIOR_DRAWS, SPRT, elo_ratings, expected_score, parse_sprt
+
+
+def test_elo_two_players():
+    #a scores 30 of 40 against b; with the virtual ties the fitted difference
+    #is the log odds of a's score
+    results = [('a', 'b', 1)] * 30 + [('a', 'b', 0)] * 10
+    table = elo_ratings(['a', 'b'], results)
+    ratings = {name: rating for name, rating, _, _, _ in table}
+    score = (30 + PRIOR_DRAWS / 2) / (40 + PRIOR_DRAWS)
+    difference = ELO_SCALE * math.log(score / (1 - score))
+    assert abs(ratings['a'] - difference / 2) < 1e-3
+    assert abs(ratings['b'] + difference / 2) < 1e-3
+    assert [row[0] for row in table] == ['a', 'b']
+    assert table[0][3] == 40 and table[0][4] == 0.75
+
+
+def test_elo_ranks_a_chain_of_players():
+    #a beats b and b beats c by the same margin: evenly spaced, centered on 0
+    results = ([('a', 'b', 1)] * 15 + [('a', 'b', 0)] * 5 +
+               [('b', 'c', 1)] * 15 + [('b', 'c', 0)] * 5)
+    table = elo_ratings(['c', 'b', 'a'], results)
+    assert [row[0] for row in table] == ['a', 'b', 'c']
+    ratings = [row[1] for row in table]
+    assert abs(sum(ratings)) < 1e-6
+    assert abs((ratings[0] - ratings[1]) - (ratings[1] - ratings[2])) < 1e-3
+    #b played twice as many games, so its rating is the best known
+    assert table[1][2] < table[0][2]
+
+
+def test_sprt_accepts_and_rejects():
+    sprt = SPRT(0, 200)
+    for _ in range(4):
+        sprt.add(1)
+    #With only wins the log likelihood ratio is N log(s1 / s0)
+    assert abs(sprt.llr() - 4 * math.log(expected_score(200) / expected_score(0))) < 1e-9
+    assert sprt.status() is None
+    while sprt.status() is None:
+        sprt.add(1)
+    assert sprt.status() == 'H1'
+
+    sprt = SPRT(0, 200)
+    while sprt.status() is None:
+        sprt.add(0)
+    assert sprt.status() == 'H0'
+
+    #Even results sit between the hypotheses for a while
+    sprt = SPRT(0, 200)
+    for score in [1, 0, 0.5, 1, 0, 0.5]:
+        sprt.add(score)
+    assert sprt.status() is None
+
+
+def test_sprt_error_rate():
+    #With no real difference H1 is accepted about alpha of the time
+    rng = random.Random(8)
+    accepted = 0
+    runs = 400
+    for _ in range(runs):
+        sprt = parse_sprt('0,200')
+        while sprt.status() is None:
+            r = rng.random()
+            sprt.add(1 if r < 0.4 else 0.5 if r < 0.6 else 0)
+        accepted += sprt.status() == 'H1'
+    assert accepted / runs < 0.08
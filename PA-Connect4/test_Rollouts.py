@@ -0,0 +1,67 @@
+#Checks the batched random playouts against the exact odds of random play
+#
+#   python -m pytest -q
+
+import random
+
+import numpy as np
+
+from Bitboard import COLS, ROWS, Position, alignment
+from MCTS import MCTSTree
+from Rollouts import alignments, batch_rollouts
+from test_Solver import random_position
+
+
+def random_play_odds(position, mover, player_num):
+    #Chances of [loss, tie, win] for player_num when both players play
+    #uniformly random moves from position, mover to move
+    moves = position.get_valid_moves()
+    odds = np.zeros(3)
+    for col in moves:
+        if position.is_winning_move(col, mover):
+            odds[2 if mover == player_num else 0] += 1
+            continue
+        position.make_move(col, mover)
+        if position.is_full():
+            odds[1] += 1
+        else:
+            odds += random_play_odds(position, 3 - mover, player_num)
+        position.unmake_move()
+    return odds / len(moves)
+
+
+def test_alignments_matches_the_bitboard_check():
+    rng = random.Random(25)
+    positions = [random_position(rng, rng.randrange(0, 30))[0] for _ in range(50)]
+    bits = [position.pieces[1] | position.pieces[2] for position in positions]
+    bits += [position.pieces[1] for position in positions]
+    found = alignments(np.array(bits, dtype=np.uint64))
+    for b, result in zip(bits, found):
+        assert result == alignment(b)
+
+
+def test_batch_rollouts_match_random_play():
+    rng = random.Random(26)
+    np_rng = np.random.default_rng(26)
+    n = 20000
+    for _ in range(4):
+        position, player_num = random_position(rng, ROWS * COLS - 8)
+        before = position.copy()
+        results = batch_rollouts(position, player_num, n, np_rng)
+        assert results.shape == (n,) and set(results.tolist()) <= {-1, 0, 1}
+        #the position is not touched
+        assert position.pieces == before.pieces and position.heights == before.heights
+
+        odds = random_play_odds(position, player_num, player_num)
+        counts = np.bincount(results + 1, minlength=3) / n
+        #about 5 standard deviations
+        assert np.abs(counts - odds).max() < 0.02
+
+
+def test_tree_backs_up_every_rollout_of_a_batch():
+    random.seed(27)
+    tree = MCTSTree(Position(), 1, batch=8)
+    tree.run(iterations=100)
+    assert tree.visits[0] == 800
+    for _, n, w in tree.root_children():
+        assert n % 8 == 0 and abs(w) <= n
@@ -0,0 +1,67 @@
+#Checks the endgame solver against a plain brute force negamax
+#
+#   python -m pytest -q
+
+import random
+
+from Bitboard import COLS, ROWS, Position, mirror_bits
+from Solver import LOSS, TIE, WIN, Solver
+
+
+def brute_force(position, player_num):
+    #Result (WIN, TIE or LOSS) of position for player_num, searching every move
+    moves = position.get_valid_moves()
+    for col in moves:
+        if position.is_winning_move(col, player_num):
+            return WIN
+    best = LOSS
+    for col in moves:
+        position.make_move(col, player_num)
+        value = TIE if position.is_full() else -brute_force(position, 3 - player_num)
+        position.unmake_move()
+        best = max(best, value)
+        if best == WIN:
+            break
+    return best
+
+
+def random_position(rng, num_moves):
+    #A position num_moves random moves in where nobody has won, and the player to move
+    while True:
+        position = Position()
+        player_num = 1
+        for _ in range(num_moves):
+            col = rng.choice(position.get_valid_moves())
+            if position.is_winning_move(col, player_num):
+                break
+            position.make_move(col, player_num)
+            player_num = 3 - player_num
+        else:
+            return position, player_num
+
+
+def test_solver_matches_brute_force():
+    rng = random.Random(5)
+    solver = Solver()
+    for _ in range(40):
+        position, player_num = random_position(rng, ROWS * COLS - rng.choice([6, 8, 10]))
+        result, move = solver.best_move(position, player_num)
+        assert result == brute_force(position.copy(), player_num)
+
+        #The move it returns gets that result
+        if position.is_winning_move(move, player_num):
+            assert result == WIN
+        else:
+            position.make_move(move, player_num)
+            assert (TIE if position.is_full() else -brute_force(position, 3 - player_num)) == result
+
+
+def test_solver_mirror_images_agree():
+    #A position and its mirror image share the solver's table entries
+    rng = random.Random(6)
+    solver = Solver()
+    for _ in range(20):
+        position, player_num = random_position(rng, ROWS * COLS - 10)
+        mirrored = Position.from_pieces(mirror_bits(position.pieces[1]), mirror_bits(position.pieces[2]))
+        assert solver.best_move(position, player_num)[0] == solver.best_move(mirrored, player_num)[0]
+        assert solver.best_move(mirrored, player_num)[0] == brute_force(mirrored.copy(), player_num)
@@ -0,0 +1,93 @@
+#Checks the transposition table's entries, replacement policies and the
+#Zobrist hashes it is indexed by
+#
+#   python -m pytest -q
+
+import random
+
+import pytest
+
+from Bitboard import Position
+from TranspositionTable import EXACT, LOWER, NO_MOVE, UPPER, TranspositionTable
+
+
+def test_store_and_probe_keep_the_bound_type():
+    table = TranspositionTable(8)
+    table.store(1, 12, 3, EXACT, 4)
+    table.store(2, -7, 2, LOWER, 0)
+    table.store(3, 300, 5, UPPER)
+    assert table.probe(1) == (12, 3, EXACT, 4)
+    assert table.probe(2) == (-7, 2, LOWER, 0)
+    assert table.probe(3) == (300, 5, UPPER, NO_MOVE)
+    assert table.probe(4) is None
+    assert table.hits == 3 and table.probes == 4
+
+
+def test_colliding_keys_are_told_apart():
+    #Keys with the same low bits share a slot, and the full key is checked
+    table = TranspositionTable(4, 'always')
+    table.store(5, 1, 1, EXACT)
+    assert table.probe(5 + 16) is None
+    table.store(5 + 16, 2, 1, EXACT)
+    assert table.probe(5) is None
+    assert table.probe(5 + 16) == (2, 1, EXACT, NO_MOVE)
+
+
+def test_depth_policy_keeps_the_deeper_entry():
+    table = TranspositionTable(4, 'depth')
+    table.store(5, 1, 4, EXACT)
+    table.store(5 + 16, 2, 3, LOWER)
+    assert table.probe(5) == (1, 4, EXACT, NO_MOVE)
+    #the same depth or deeper replaces it
+    table.store(5 + 16, 3, 4, UPPER)
+    assert table.probe(5 + 16) == (3, 4, UPPER, NO_MOVE)
+
+    table = TranspositionTable(4, 'always')
+    table.store(5, 1, 4, EXACT)
+    table.store(5 + 16, 2, 0, LOWER)
+    assert table.probe(5 + 16) == (2, 0, LOWER, NO_MOVE)
+
+
+def test_clear_empties_the_table():
+    table = TranspositionTable(4)
+    table.store(5, 1, 4, EXACT)
+    table.probe(5)
+    table.clear()
+    assert table.probe(5) is None
+    assert table.hits == 0 and table.stores == 0
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        TranspositionTable(4, 'newest')
+
+
+def test_zobrist_hash_follows_the_moves():
+    #A position has the same hash however it was reached, and unmaking moves
+    #gives back the earlier hashes
+    rng = random.Random(3)
+    for _ in range(50):
+        position = Position()
+        hashes = [position.hash]
+        player_num = 1
+        for _ in range(rng.randrange(1, 30)):
+            col = rng.choice(position.get_valid_moves())
+            if position.is_winning_move(col, player_num):
+                break
+            position.make_move(col, player_num)
+            hashes.append(position.hash)
+            player_num = 3 - player_num
+        assert Position.from_board(position.to_board()).hash == position.hash
+        while position.history:
+            hashes.pop()
+            position.unmake_move()
+            assert position.hash == hashes[-1]
+
+    #Two move orders that reach the same position
+    a = Position()
+    for col, player_num in [(3, 1), (2, 2), (4, 1)]:
+        a.make_move(col, player_num)
+    b = Position()
+    for col, player_num in [(4, 1), (2, 2), (3, 1)]:
+        b.make_move(col, player_num)
+    assert a.hash == b.hash